@@ -4,22 +4,26 @@
 # ==============================================================================
 
 import streamlit as st
-import numpy as np
-import cv2
 import os
 import random
 import time
-import urllib.request
-import base64
-from PIL import Image
-from io import BytesIO
-
-# --- Try Importing gTTS for Audio Alerts ---
-try:
-    from gtts import gTTS
-    AUDIO_AVAILABLE = True
-except ImportError:
-    AUDIO_AVAILABLE = False
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from tripsafe_engine import (
+    HazardDetector, ScanResultCache, DEFAULT_PROFILE, INGEST_MIN_SIDE, INGEST_MIN_SIDE_TILED, detector_settings,
+    decode_image_bytes, make_tiles, estimate_floor_roi, detect_hazards_and_zones,
+    render_display_image, render_full_resolution, get_placement_suggestions, generate_report,
+    risk_level, expand_uploads, HIGH_RISK_ITEMS, scan_batch, time_single_scan,
+)
+from tripsafe_assets import APP_DIR, PageAssets
+from tripsafe_audio import AlertAudio, alert_phrases, audio_html
+from tripsafe_history import HistoryStore
+from tripsafe_live import LivePipeline
+from tripsafe_metrics import metrics
+from tripsafe_profiles import LATENCY_BUDGET_MS, calibrated_profiles, choose_profile
+from tripsafe_service import InferenceService, configure_threads
+from tripsafe_tracking import ChangeGate, CHANGE_THRESHOLD
+from tripsafe_video import VIDEO_EXTS, analyse_upload, format_ts
 
 # --- Page Config (Must be first) ---
 st.set_page_config(
@@ -28,6 +32,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+run_t0 = time.perf_counter()
 
 # --- Localization / Translations ---
 LANGUAGES = {
@@ -60,6 +65,7 @@ LANGUAGES = {
         "tab_scanner": "🔍 Scanner",
         "tab_settings": "⚙️ Config",
         "tab_info": "ℹ️ Info & Support",
+        "tab_history": "🗂️ History",
         "home_hero_title": "Making Every Step Safe.",
         "home_hero_subtitle": "AI-powered vision to detect hazards and prevent falls before they happen.",
         "home_features_title": "Why Choose TripSafe?",
@@ -67,6 +73,27 @@ LANGUAGES = {
         "select": "Mode:",
         "upload": "File Upload",
         "camera": "Live Camera",
+        "batch": "Batch Scan",
+        "live": "Live Stream",
+        "video": "Video File",
+        "video_events": "Hazard Timeline",
+        "live_source": "Camera index or video file",
+        "live_start": "▶️ Start",
+        "live_stop": "⏹️ Stop",
+        "room_tag": "Room / Tag",
+        "history_empty": "No scans recorded yet.",
+        "history_item": "Item",
+        "history_period": "Period",
+        "history_all": "All",
+        "history_all_time": "All time",
+        "history_last_days": "Last {d} days",
+        "history_newer": "◀ Newer",
+        "history_older": "Older ▶",
+        "history_page": "Page {page} · {count} scans match",
+        "history_rooms_with": "Rooms where {item} was found",
+        "decode_error": "Could not read this image. Please upload a JPG or PNG photo.",
+        "model_error": "The detection model could not be loaded",
+        "model_unverified": "Development mode: the model was loaded from loose files without a checksum manifest.",
         "high_risk": "CRITICAL RISK",
         "caution": "CAUTION ADVISED",
         "safe": "SAFE ENVIRONMENT",
@@ -78,6 +105,11 @@ LANGUAGES = {
         "safe_zones": "Safe Zones",
         "suggestions": "🤖 AI Recommendations:",
         "download_report": "📥 Export Safety Report",
+        "full_res": "🖼️ Full-Resolution Image",
+        "download_image": "📥 Download Annotated Image",
+        "preview_quality": "Preview Quality",
+        "tiled_scan": "Tiled Scan (small items)",
+        "floor_region": "Floor Region",
         "settings_config": "### ⚙️ System Parameters",
         "sensitivity": "**AI Sensitivity**",
         "alerts": "**Notifications**",
@@ -119,6 +151,7 @@ LANGUAGES = {
         "tab_scanner": "🔍 स्कैनर",
         "tab_settings": "⚙️ सेटिंग्स",
         "tab_info": "ℹ️ जानकारी और सहायता",
+        "tab_history": "🗂️ इतिहास",
         "home_hero_title": "हर कदम सुरक्षित।",
         "home_hero_subtitle": "AI-संचालित तकनीक जो गिरने से पहले खतरों को पहचानती है।",
         "home_features_title": "TripSafe ही क्यों?",
@@ -126,6 +159,27 @@ LANGUAGES = {
         "select": "मोड:",
         "upload": "फाइल अपलोड",
         "camera": "लाइव कैमरा",
+        "batch": "बैच स्कैन",
+        "live": "लाइव स्ट्रीम",
+        "video": "वीडियो फाइल",
+        "video_events": "खतरों की समय-रेखा",
+        "live_source": "कैमरा नंबर या वीडियो फाइल",
+        "live_start": "▶️ शुरू करें",
+        "live_stop": "⏹️ रोकें",
+        "room_tag": "कमरा / टैग",
+        "history_empty": "अभी तक कोई स्कैन दर्ज नहीं है।",
+        "history_item": "वस्तु",
+        "history_period": "अवधि",
+        "history_all": "सभी",
+        "history_all_time": "पूरा समय",
+        "history_last_days": "पिछले {d} दिन",
+        "history_newer": "◀ नए",
+        "history_older": "पुराने ▶",
+        "history_page": "पेज {page} · {count} स्कैन मिले",
+        "history_rooms_with": "कमरे जहाँ {item} मिला",
+        "decode_error": "यह फोटो पढ़ी नहीं जा सकी। कृपया JPG या PNG फोटो अपलोड करें।",
+        "model_error": "डिटेक्शन मॉडल लोड नहीं हो सका",
+        "model_unverified": "डेवलपमेंट मोड: मॉडल बिना चेकसम मैनिफ़ेस्ट वाली फ़ाइलों से लोड हुआ है।",
         "high_risk": "गंभीर जोखिम",
         "caution": "सावधानी बरतें",
         "safe": "सुरक्षित क्षेत्र",
@@ -137,6 +191,11 @@ LANGUAGES = {
         "safe_zones": "सुरक्षित जगहें",
         "suggestions": "🤖 AI सुझाव:",
         "download_report": "📥 रिपोर्ट डाउनलोड करें",
+        "full_res": "🖼️ पूरी क्वालिटी की फोटो",
+        "download_image": "📥 फोटो डाउनलोड करें",
+        "preview_quality": "प्रीव्यू क्वालिटी",
+        "tiled_scan": "टाइल्ड स्कैन (छोटी चीज़ें)",
+        "floor_region": "फर्श क्षेत्र",
         "settings_config": "### ⚙️ सिस्टम सेटिंग्स",
         "sensitivity": "**AI संवेदनशीलता**",
         "alerts": "**सूचनाएं**",
@@ -151,8 +210,7 @@ LANGUAGES = {
 }
 
 # --- Enhanced Custom CSS ---
-st.markdown("""
-<style>
+APP_CSS = """
 @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;800&display=swap');
 html, body, [class*="css"] {
     font-family: 'Inter', sans-serif;
@@ -376,155 +434,136 @@ details > div {
 h1, h2, h3 { color: #f8fafc !important; }
 p, li { color: #cbd5e1 !important; }
 strong { color: #38bdf8 !important; }
-</style>
-""", unsafe_allow_html=True)
+"""
 
 # ==============================================================================
 # 1. Model & Asset Management
 # ==============================================================================
-def get_local_logo_base64(file_path="triphazard.png"):
-    """Reads local logo or falls back to reliable online 3D logo."""
-    try:
-        if os.path.exists(file_path):
-            with open(file_path, "rb") as f:
-                data = f.read()
-            b64_data = base64.b64encode(data).decode()
-            mime = "image/jpeg" if file_path.lower().endswith(".jpg") else "image/png"
-            return f"data:{mime};base64,{b64_data}"
-    except: pass
-    # Fallback to the reliable online 3D logo
-    return "http://googleusercontent.com/image_generation_content/3"
-
-def repair_model_files():
-    files = {
-        "yolov3-tiny.cfg": "https://raw.githubusercontent.com/pjreddie/darknet/master/cfg/yolov3-tiny.cfg",
-        "yolov3-tiny.weights": "https://pjreddie.com/media/files/yolov3-tiny.weights",
-        "coco.names": "https://raw.githubusercontent.com/pjreddie/darknet/master/data/coco.names"
-    }
-    try:
-        for filename, url in files.items():
-            if os.path.exists(filename): os.remove(filename)
-            urllib.request.urlretrieve(url, filename)
-        return True
-    except: return False
+LOGO_FILENAME = "triphazard.png"
+
+@st.cache_resource
+def get_page_assets():
+    # Downscaled logo variants and the CSS are written once as hashed static files
+    return PageAssets(os.path.join(APP_DIR, LOGO_FILENAME), APP_CSS, st.get_option("server.enableStaticServing"))
+
+page_assets = get_page_assets()
+st.markdown(page_assets.css_html, unsafe_allow_html=True)
+
+@st.cache_resource
+def get_profiles():
+    # Timed once per process (and saved per host), so later starts skip the calibration runs
+    return calibrated_profiles()
+
+# The budget is app-wide (TRIPSAFE_LATENCY_BUDGET_MS), so every session runs the same profile
+# and shares one Net pool; a per-session budget would make sessions evict each other's pool
+profile = choose_profile(get_profiles(), LATENCY_BUDGET_MS) or DEFAULT_PROFILE
+
+@st.cache_resource
+def configure_opencv():
+    # OpenCV's thread count is process-wide, so it is set once here rather than per service
+    return configure_threads()
+
+configure_opencv()
+
+@st.cache_resource
+def get_inference_service(profile):
+    # All sessions' scans share this Net pool; nothing else in the app holds a Net
+    return InferenceService(profile=profile)
+
+inference_service = get_inference_service(profile)
+detector = HazardDetector(service=inference_service)
+net, output_layers, classes = detector.net, detector.output_layers, detector.classes
+model_ready = detector.ready
+
+SCAN_POLL_SECONDS = 0.1
+
+@st.cache_resource
+def get_video_executor():
+    # One video at a time per process; each analysis fans out to its own process pool
+    return ThreadPoolExecutor(1, thread_name_prefix="video")
+
+@st.cache_resource
+def get_scan_cache():
+    return ScanResultCache()
+
+scan_cache = get_scan_cache()
 
 @st.cache_resource
-def load_yolo_model():
-    cfg, weights, names = "yolov3-tiny.cfg", "yolov3-tiny.weights", "coco.names"
-    if not os.path.exists(weights) or os.path.getsize(weights) < 1000000: repair_model_files()
-    try:
-        net = cv2.dnn.readNetFromDarknet(cfg, weights)
-        net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
-        net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
-        try: output_layers = [net.getLayerNames()[i - 1] for i in net.getUnconnectedOutLayers()]
-        except: output_layers = [net.getLayerNames()[i[0] - 1] for i in net.getUnconnectedOutLayers()]
-        classes = []
-        if os.path.exists(names):
-            with open(names, "r") as f: classes = [line.strip() for line in f.readlines()]
-        return net, output_layers, classes
-    except:
-        if repair_model_files(): return load_yolo_model()
-        return None, None, None
-
-net, output_layers, classes = load_yolo_model()
+def start_metrics_export():
+    # Optional Prometheus textfile for node_exporter, rewritten every 15 s
+    path = os.environ.get("TRIPSAFE_METRICS_FILE")
+    return metrics.start_textfile_writer(path) if path and metrics.enabled else None
+
+start_metrics_export()
+
+@st.cache_resource
+def get_history_store():
+    # One SQLite writer thread per process; scans are committed in batches
+    return HistoryStore()
+
+history = get_history_store()
 
 # ==============================================================================
 # 2. Helper Functions
 # ==============================================================================
-def text_to_speech_autoplay(text):
-    if not AUDIO_AVAILABLE: return
-    try:
-        tts = gTTS(text=text, lang='en')
-        fp = BytesIO()
-        tts.write_to_fp(fp)
-        fp.seek(0)
-        b64 = base64.b64encode(fp.read()).decode()
-        st.markdown(f'<audio controls autoplay style="display:none;"><source src="data:audio/mp3;base64,{b64}" type="audio/mp3"></audio>', unsafe_allow_html=True)
-    except: pass
-
-def detect_hazards_and_zones(image, net, output_layers, classes, conf_threshold, nms_threshold):
-    HIGH_RISK_ITEMS = ['sports ball', 'bottle', 'cup', 'wine glass', 'bowl', 'knife', 'spoon', 'fork', 'scissors', 'mouse', 'remote', 'cell phone', 'keyboard', 'book', 'laptop', 'backpack', 'suitcase', 'handbag', 'umbrella', 'teddy bear']
-    SAFE_ZONES = ['dining table', 'desk', 'sofa', 'bed', 'cabinet', 'refrigerator', 'shelf']
-    
-    img = np.array(image.convert('RGB')) 
-    img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-    h_img, w_img, _ = img.shape
-    
-    blob = cv2.dnn.blobFromImage(img, 0.00392, (416, 416), (0, 0, 0), True, crop=False)
-    net.setInput(blob)
-    outs = net.forward(output_layers)
-    
-    class_ids, confidences, boxes = [], [], []
-    for out in outs:
-        for detection in out:
-            scores = detection[5:]
-            class_id = np.argmax(scores)
-            confidence = scores[class_id]
-            if confidence > conf_threshold:
-                center_x, center_y = int(detection[0]*w_img), int(detection[1]*h_img)
-                w, h = int(detection[2]*w_img), int(detection[3]*h_img)
-                x, y = int(center_x - w/2), int(center_y - h/2)
-                boxes.append([x, y, w, h])
-                confidences.append(float(confidence))
-                class_ids.append(class_id)
-                
-    indexes = cv2.dnn.NMSBoxes(boxes, confidences, conf_threshold, nms_threshold)
-    hazards, safe_zones_found = [], []
-    
-    if len(indexes) > 0:
-        for i in indexes.flatten():
-            x, y, w, h = boxes[i]
-            label = str(classes[class_ids[i]])
-            color = (0, 0, 255) if label in HIGH_RISK_ITEMS else ((0, 255, 0) if label in SAFE_ZONES else (0, 165, 255))
-            if label in HIGH_RISK_ITEMS: hazards.append(label)
-            elif label in SAFE_ZONES: safe_zones_found.append(label)
-            
-            # Draw Styled Box
-            cv2.rectangle(img, (x, y), (x+w, y+h), color, 2)
-            
-            # Draw Styled Label Background
-            label_text = f"{label.title()}"
-            (tw, th), _ = cv2.getTextSize(label_text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 1)
-            cv2.rectangle(img, (x, y - th - 10), (x + tw + 10, y), color, -1)
-            cv2.putText(img, label_text, (x + 5, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-
-    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB), hazards, safe_zones_found, HIGH_RISK_ITEMS
-
-def get_placement_suggestions(hazards, safe_zones, lang_code="English"):
-    suggestions = []
-    furniture = list(set(safe_zones))
-    is_hindi = lang_code == "Hindi"
-    
-    for item in set(hazards):
-        sug = "Clear from floor." if not is_hindi else "फर्श से हटाएं।"
-        if item == 'bottle':
-            sug = "If water bottle: **Kitchen/Table**. If medicine: **Cabinet**." if not is_hindi else "यदि पानी की बोतल है: **किचन/टेबल**। यदि दवा है: **अलमारी**।"
-        elif item in ['cup', 'bowl']:
-            sug = "Move to **Kitchen** or **Dining Table**." if not is_hindi else "**किचन** या **डाइनिंग टेबल** पर रखें।"
-        elif item in ['book', 'laptop', 'mouse']:
-            if 'desk' in furniture: sug = "Place on **Desk**." if not is_hindi else "**डेस्क** पर रखें।"
-            else: sug = "Store on shelf." if not is_hindi else "शेल्फ पर रखें।"
-        elif item in ['backpack', 'handbag']:
-            if 'sofa' in furniture: sug = "Place on **Sofa**." if not is_hindi else "**सोफा** पर रखें।"
-            else: sug = "Hang in closet." if not is_hindi else "अलमारी में रखें।"
-        suggestions.append(f"🔸 **{item.title()}**: {sug}")
-    return suggestions
-
-def generate_report(items, suggestions, risk):
-    txt = f"TRIPSAFE AI REPORT\nDate: {time.strftime('%c')}\nStatus: {risk}\n\nITEMS FOUND:\n" + "\n".join([f"- {i}" for i in set(items)])
-    txt += "\n\nRECOMMENDED ACTIONS:\n" + "\n".join([s.replace('**','') for s in suggestions])
-    return txt
+@st.cache_resource
+def get_alert_audio():
+    audio = AlertAudio()
+    audio.prerender(alert_phrases(LANGUAGES))  # background thread; startup does not wait
+    return audio
+
+alert_audio = get_alert_audio()
+
+def text_to_speech_autoplay(text, lang_code="English"):
+    # Plays only cached audio; a phrase still being synthesized is skipped for this alert
+    path = alert_audio.get(text, lang_code)
+    if path: st.markdown(audio_html(path, page_assets.static_serving), unsafe_allow_html=True)
+
+RISK_COLORS = {"high_risk": "#fc8181", "caution": "#f6e05e", "safe": "#68d391"}
+
+def assess_risk(hazards, risk_list, txt):
+    level, risk_count = risk_level(hazards, risk_list)
+    return txt[level], RISK_COLORS[level], txt[f"{level}_msg"].format(count=risk_count)
+
+def floor_settings():
+    floor_mode = st.session_state.get("floor_mode", "off")
+    user_roi = (st.session_state.get("roi_x", (0.0, 1.0)), st.session_state.get("roi_y", (0.5, 1.0))) if floor_mode == "custom" else None
+    return floor_mode, user_roi
+
+def show_batch_result(r, txt):
+    if r.get("error"): st.warning(f"{r['name']}: {txt['decode_error']}")
+    else: st.image(r["preview"], caption=f"{r['name']} · {assess_risk(r['hazards'], r['risk_list'], txt)[0]}", use_container_width=True)
+
+def record_scan(image_hash, detections, hazards, risk_list, source):
+    # Once per image and room per session, so slider changes do not log the same photo again
+    room = st.session_state.get("room_tag", "").strip()
+    logged = st.session_state.setdefault("history_logged", set())
+    if (image_hash, room) in logged: return
+    logged.add((image_hash, room))
+    history.record(image_hash, detections, risk_level(hazards, risk_list)[0], room, source, profile['name'])
+
+def generate_batch_report(results, txt, lang_code="English"):
+    lines = [f"TRIPSAFE AI BATCH REPORT\nDate: {time.strftime('%c')}\nImages: {len(results)}\n"]
+    all_hazards, all_zones = [], []
+    for r in results:
+        if r.get("error"):
+            lines.append(f"[{r['name']}] could not be read")
+            continue
+        status = assess_risk(r["hazards"], r["risk_list"], txt)[0]
+        items = ", ".join(sorted(set(r["hazards"]))) or "-"
+        lines.append(f"[{r['name']}] {status}: {items}")
+        all_hazards += r["hazards"]
+        all_zones += r["zones"]
+    sugs = get_placement_suggestions(all_hazards, all_zones, lang_code)
+    lines.append("\nRECOMMENDED ACTIONS:\n" + "\n".join([s.replace('**','') for s in sugs]))
+    return "\n".join(lines)
 
 # ==============================================================================
 # 3. Sidebar
 # ==============================================================================
 with st.sidebar:
-    # ⬇️ USING triphazard.png
-    LOGO_FILENAME = "triphazard.png" 
-    
-    logo_src = get_local_logo_base64(LOGO_FILENAME)
     # Reduced size to 80px as requested
-    st.markdown(f'<div style="text-align: center; margin-bottom: 5px;"><img src="{logo_src}" class="interactive-logo" style="width: 80px; max-width: 80px;"></div>', unsafe_allow_html=True)
+    st.markdown(f'<div style="text-align: center; margin-bottom: 5px;">{page_assets.logo_img(style="width: 80px; max-width: 80px;")}</div>', unsafe_allow_html=True)
     
     lang = st.selectbox("🌐 Language / भाषा", ["English", "Hindi"])
     txt = LANGUAGES[lang]
@@ -543,7 +582,7 @@ with st.sidebar:
 <div style="background: rgba(255, 255, 255, 0.05); padding: 15px; border-radius: 10px; border: 1px solid rgba(255,255,255,0.1);">
 <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 8px;">
 <span>🧠 Model</span>
-<span style="color: #38bdf8; font-weight: bold;">YOLOv3 Tiny</span>
+<span style="color: #38bdf8; font-weight: bold;">{profile['name']}{f" · {profile['latency_ms']:.0f} ms" if 'latency_ms' in profile else ''}</span>
 </div>
 <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 8px;">
 <span>👁️ Vision</span>
@@ -576,19 +615,16 @@ st.markdown("""
 col_logo, col_tabs = st.columns([1, 6])
 
 with col_logo:
-    # Logo Display (Fixed to use logo_src)
-    logo_src = get_local_logo_base64(LOGO_FILENAME)
-    
     st.markdown(f"""
 <div style="display: flex; align-items: center; height: 60px;">
-<img src="{logo_src}" class="interactive-logo" style="width: 80px;">
+{page_assets.logo_img()}
 </div>
 """, unsafe_allow_html=True)
 
 with col_tabs:
     # Optimized Tabs: 4 Main Tabs
-    tab_home, tab_scanner, tab_settings, tab_info = st.tabs([
-        txt['tab_home'], txt['tab_scanner'], txt['tab_settings'], txt['tab_info']
+    tab_home, tab_scanner, tab_history, tab_settings, tab_info = st.tabs([
+        txt['tab_home'], txt['tab_scanner'], txt['tab_history'], txt['tab_settings'], txt['tab_info']
     ])
 
 # --- TAB 1: HOME ---
@@ -619,36 +655,96 @@ with tab_home:
         # High Quality Home Image
         st.markdown('<img src="https://images.pexels.com/photos/1643383/pexels-photo-1643383.jpeg?auto=compress&cs=tinysrgb&w=800" class="hero-image">', unsafe_allow_html=True)
 
-# --- TAB 2: SCANNER ---
-with tab_scanner:
-    c1, c2 = st.columns([1, 2])
-    with c1:
-        st.markdown(txt['input_source'])
-        src = st.radio(txt['select'], [txt['upload'], txt['camera']], label_visibility="collapsed")
-        img_file = st.file_uploader(txt['upload'], type=['jpg','png']) if src == txt['upload'] else st.camera_input(txt['camera'])
+# --- Single-image scan (upload or camera) ---
+@st.fragment(run_every=SCAN_POLL_SECONDS)
+def show_scan_progress():
+    # Reruns on its own while the scan job is pending; the whole page reruns once it is done
+    job = st.session_state.get("scan_job")
+    if job is None or job["future"].done(): st.rerun()
+    elapsed_ms = (time.perf_counter() - job["t0"]) * 1000
+    expected_ms = inference_service.stats()["p50_ms"] or 1000
+    st.progress(min(0.95, elapsed_ms / (expected_ms * 1.2)), text=f"Scanning... {elapsed_ms / 1000:.1f}s")
 
-    with c2:
-        if img_file and net:
-            img = Image.open(img_file)
-            with st.spinner("Scanning..."):
-                time.sleep(0.5) 
-                res_img, hazards, zones, risk_list = detect_hazards_and_zones(img, net, output_layers, classes, 0.25, 0.4)
-            
-            st.image(res_img, caption="AI Analysis Result", use_container_width=True)
-            
-            risk_count = sum(1 for i in hazards if i in risk_list)
-            if risk_count > 0:
-                status, color, msg = txt['high_risk'], "#fc8181", txt['high_risk_msg'].format(count=risk_count)
-            elif hazards:
-                status, color, msg = txt['caution'], "#f6e05e", txt['caution_msg']
-            else:
-                status, color, msg = txt['safe'], "#68d391", txt['safe_msg']
-            
-            if "audio_on" not in st.session_state: st.session_state.audio_on = True
-            if st.session_state.audio_on and status != txt['safe']: text_to_speech_autoplay(msg)
-            
-            # Metrics
-            st.markdown(f"""
+def show_scan_result(img_file, src):
+    # Errors end only this block, so the tabs below the scanner still render
+    img_key = hashlib.sha256(img_file.getvalue()).hexdigest()
+    conf, nms = st.session_state.get("conf", 0.25), st.session_state.get("nms", 0.4)
+    quality = st.session_state.get("preview_quality", 80)
+    tiled = st.session_state.get("tiled", False)
+    tiling = (st.session_state.get("tile_size", 416), st.session_state.get("tile_overlap", 0.2)) if tiled else None
+    floor_mode, user_roi = floor_settings()
+    raw_key = (img_key, profile['name'], tiling, floor_mode, user_roi)
+    cache_key = (img_key, profile['name'], round(conf, 4), round(nms, 4), quality, tiling, floor_mode, user_roi)
+    scan = scan_cache.get(cache_key)
+    job = st.session_state.get("scan_job")
+    if job and job["key"] != raw_key:
+        # A new upload or setting supersedes the pending scan; if still queued it never runs
+        job["future"].cancel()
+        job = st.session_state.scan_job = None
+    if scan is None and job:
+        img, ingest, roi = job["img"], job["ingest"], job["roi"]
+    elif scan is None:
+        img, ingest = decode_image_bytes(img_file.getvalue(), INGEST_MIN_SIDE_TILED if tiled else INGEST_MIN_SIDE)
+        if img is None:
+            st.error(txt['decode_error'])
+            return
+        roi = estimate_floor_roi(img, floor_mode, user_roi) if floor_mode != "off" else None
+    if scan is None:
+        # Raw network outputs are cached per image; slider changes only re-run NMS and drawing
+        prev_key = st.session_state.get("raw_outs_key")
+        if prev_key != raw_key and src == txt['camera'] and not job:
+            # A new camera capture of an unchanged scene reuses the previous network outputs
+            camera_gate = st.session_state.setdefault("camera_gate", ChangeGate())
+            camera_gate.threshold = st.session_state.get("change_threshold", CHANGE_THRESHOLD)
+            same_scene = prev_key is not None and prev_key[1:] == raw_key[1:] and camera_gate.difference(img) < camera_gate.threshold
+            camera_gate.record(same_scene)
+            if same_scene:
+                st.session_state.raw_outs_key = raw_key
+                st.session_state.raw_outs_info = dict(st.session_state.raw_outs_info, ms=0.0)
+        if st.session_state.get("raw_outs_key") != raw_key:
+            # Inference runs as a background job on the shared service; a fragment polls it,
+            # so widgets stay live and the rest of the page is not re-run while the network works
+            if job is None:
+                if not inference_service.ready:
+                    st.error(f"{txt['model_error']}: {inference_service.model_info.get('error') or 'inference service is not running'}")
+                    return
+                job = st.session_state.scan_job = {"key": raw_key, "future": inference_service.submit(img, tiling, roi), "t0": time.perf_counter(), "img": img, "ingest": ingest, "roi": roi}
+                # Finish time is stamped by the worker, so the fragment's poll interval is not counted
+                job["future"].add_done_callback(lambda f, job=job: job.setdefault("t1", time.perf_counter()))
+            if not job["future"].done():
+                show_scan_progress()
+                return
+            elapsed_ms = (job.get("t1", time.perf_counter()) - job["t0"]) * 1000
+            st.session_state.scan_job = None
+            if job["future"].exception():
+                st.error(f"{txt['model_error']}: {job['future'].exception()}")
+                return
+            st.session_state.raw_outs = job["future"].result()
+            scanned_w, scanned_h = (roi[2], roi[3]) if roi else (img.shape[1], img.shape[0])
+            n_tiles = len(make_tiles(scanned_w, scanned_h, *tiling)) if tiled else 0
+            st.session_state.raw_outs_info = {"tiles": n_tiles, "ms": elapsed_ms, "area": scanned_w * scanned_h / (img.shape[0] * img.shape[1])}
+            st.session_state.raw_outs_key = raw_key
+        detections, hazards, zones, risk_list = detect_hazards_and_zones(img, net, output_layers, classes, conf, nms, outs=st.session_state.raw_outs, roi=roi)
+        preview = render_display_image(img, detections, quality=quality, roi=roi)
+        scan = {"preview": preview, "detections": detections, "hazards": hazards, "zones": zones, "risk_list": risk_list, "ingest": ingest, "inference": st.session_state.raw_outs_info}
+        scan_cache.put(cache_key, scan, len(preview))
+    detections, hazards, zones, risk_list, ingest = scan["detections"], scan["hazards"], scan["zones"], scan["risk_list"], scan["ingest"]
+    record_scan(img_key, detections, hazards, risk_list, "camera" if src == txt['camera'] else "upload")
+    
+    st.image(scan["preview"], caption="AI Analysis Result", use_container_width=True)
+    st.caption(f"Ingest: {ingest['source'][0]}×{ingest['source'][1]} → {ingest['decoded'][0]}×{ingest['decoded'][1]} (1/{ingest['factor']} decode), {ingest['bytes_saved'] / 1e6:.1f} MB of frame copies saved")
+    st.caption(f"Inference: {scan['inference']['area']:.0%} of the frame, full view + {scan['inference']['tiles']} tiles in {scan['inference']['ms']:.0f} ms")
+    if src == txt['camera'] and st.session_state.get("camera_gate"):
+        gate = st.session_state.camera_gate
+        st.caption(f"Unchanged scene skips: {gate.skipped}/{gate.frames} captures ({gate.skip_rate:.0%})")
+    
+    status, color, msg = assess_risk(hazards, risk_list, txt)
+    
+    if "audio_on" not in st.session_state: st.session_state.audio_on = True
+    if st.session_state.audio_on and status != txt['safe']: text_to_speech_autoplay(msg, lang)
+    
+    # Metrics
+    st.markdown(f"""
 <div style="display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 15px; margin-top: 20px;">
 <div class="metric-container" style="border-bottom: 4px solid {color};">
 <div class="status-label">{txt['status']}</div>
@@ -664,19 +760,183 @@ with tab_scanner:
 </div>
 </div>
 """, unsafe_allow_html=True)
-            
-            sugs = get_placement_suggestions(hazards, zones, lang)
-            if sugs:
-                st.markdown(f"""
+    
+    sugs = get_placement_suggestions(hazards, zones, lang)
+    if sugs:
+        st.markdown(f"""
 <div style="background: rgba(6, 182, 212, 0.1); border-left: 4px solid #06b6d4; padding: 20px; border-radius: 12px; margin-top: 20px;">
 <h4 style="margin-top:0;">{txt["suggestions"]}</h4>
 {'<br>'.join(sugs)}
 </div>
 """, unsafe_allow_html=True)
+    
+    st.download_button(txt['download_report'], generate_report(hazards, sugs, status), "report.txt")
+    if st.button(txt['full_res']):
+        full_img = render_full_resolution(img_file.getvalue(), detections, ingest['decoded'])
+        if full_img: st.download_button(txt['download_image'], full_img, "tripsafe_scan.jpg", "image/jpeg")
+
+# --- Video job progress ---
+VIDEO_POLL_SECONDS = 0.5
+
+@st.fragment(run_every=VIDEO_POLL_SECONDS)
+def show_video_progress():
+    # Reruns on its own while the analysis runs; the whole page reruns once it is done
+    job = st.session_state.get("video_job")
+    if job is None or job["future"].done(): st.rerun()
+    done, total = job["progress"]["done"], job["progress"]["total"]
+    st.progress(done / total if total else 0.0, text=f"Analysing video... {done}/{total or '?'} segments · {time.perf_counter() - job['t0']:.0f}s")
+
+# --- Live stream view ---
+LIVE_REFRESH_SECONDS = 0.1
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def show_live_frame():
+    # Redrawn on its own timer from the pipeline's newest frame; the rest of the page
+    # renders once and its widgets stay live while the stream runs
+    pipe = st.session_state.get("live_pipeline")
+    if pipe is None: return
+    latest = pipe.latest()
+    if latest:
+        jpeg, result = latest
+        st.image(jpeg, use_container_width=True)
+        ls = pipe.stats()
+        line = f"{assess_risk(result['hazards'], HIGH_RISK_ITEMS, txt)[0]} · {len(result['hazards'])} {txt['hazards']} · {ls['fps']:.1f} FPS · {ls['latency_ms']:.0f} ms latency · {ls['dropped']} stale frames dropped"
+        if "tracking" in ls:
+            tr = ls["tracking"]
+            line += f" · detector on {tr['detector_runs']}/{tr['frames']} frames, ~{tr['saving']:.0%} compute time per frame saved"
+        if "skip_rate" in ls: line += f" · {ls['skip_rate']:.0%} unchanged frames skipped"
+        if "input_size" in ls: line += f" · input {ls['input_size']}px ({ls['input_reason']})"
+        st.caption(line)
+    if pipe.error: st.error(pipe.error)
+
+# --- TAB 2: SCANNER ---
+with tab_scanner:
+    c1, c2 = st.columns([1, 2])
+    with c1:
+        st.markdown(txt['input_source'])
+        src = st.radio(txt['select'], [txt['upload'], txt['camera'], txt['batch'], txt['video'], txt['live']], label_visibility="collapsed")
+        img_file, batch_files, video_file, live_on = None, None, None, src == txt['live']
+        if src == txt['upload']: img_file = st.file_uploader(txt['upload'], type=['jpg','png'])
+        elif src == txt['camera']: img_file = st.camera_input(txt['camera'])
+        elif src == txt['batch']: batch_files = st.file_uploader(txt['batch'], type=['jpg','jpeg','png','zip'], accept_multiple_files=True)
+        elif src == txt['video']: video_file = st.file_uploader(txt['video'], type=[e[1:] for e in VIDEO_EXTS])
+        else:
+            live_source = st.text_input(txt['live_source'], value="0")
+            b1, b2 = st.columns(2)
+            start_live, stop_live = b1.button(txt['live_start']), b2.button(txt['live_stop'])
+        if src in (txt['upload'], txt['camera'], txt['batch']): st.text_input(txt['room_tag'], key="room_tag", placeholder="e.g. Kitchen")
+        
+        # Leaving live mode releases the camera and the pipeline threads
+        if (not live_on or stop_live) and st.session_state.get("live_pipeline"):
+            st.session_state.live_pipeline.stop()
+            st.session_state.live_pipeline = None
+
+    with c2:
+        if not model_ready: st.error(f"{txt['model_error']}: {detector.model_info.get('error', '')}")
+        elif not detector.model_info.get("verified"): st.warning(txt["model_unverified"])
+        if img_file and model_ready:
+            show_scan_result(img_file, src)
+        
+        elif batch_files and model_ready:
+            items = list(expand_uploads(batch_files))
+            conf, nms = st.session_state.get("conf", 0.25), st.session_state.get("nms", 0.4)
+            floor_mode, user_roi = floor_settings()
+            batch_key = (hashlib.sha256(b"".join(hashlib.sha256(d).digest() for _, d in items)).hexdigest(), conf, nms, floor_mode, user_roi)
+            
+            if st.session_state.get("batch_key") != batch_key:
+                item_hashes = {name: hashlib.sha256(data).hexdigest() for name, data in items}
+                progress = st.progress(0.0, text=f"0 / {len(items)}")
+                grid, results = st.columns(4), []
+                single_s = time_single_scan(items[0][1], net, output_layers, classes, conf, nms, forward=inference_service.forward) if items else None
+                t0 = time.perf_counter()
+                for r in scan_batch(items, net, output_layers, classes, conf, nms, floor_mode, user_roi, batch_forward=inference_service.forward_batch):
+                    results.append(r)
+                    if not r.get("error"): record_scan(item_hashes[r["name"]], r["detections"], r["hazards"], r["risk_list"], "batch")
+                    progress.progress(len(results) / len(items), text=f"{len(results)} / {len(items)}")
+                    with grid[(len(results) - 1) % 4]: show_batch_result(r, txt)
+                elapsed = time.perf_counter() - t0
+                st.session_state.batch_key = batch_key
+                st.session_state.batch_results = results
+                st.session_state.batch_speed = (len(results) / elapsed if elapsed else 0.0, 1 / single_s if single_s else None)
+                progress.empty()
+            else:
+                grid, results = st.columns(4), st.session_state.batch_results
+                for i, r in enumerate(results):
+                    with grid[i % 4]: show_batch_result(r, txt)
             
-            st.download_button(txt['download_report'], generate_report(hazards, sugs, status), "report.txt")
+            batch_ips, single_ips = st.session_state.batch_speed
+            st.caption(f"Batch throughput: {batch_ips:.2f} images/s" + (f" · single-image path: {single_ips:.2f} images/s" if single_ips else ""))
+            st.download_button(txt['download_report'], generate_batch_report(st.session_state.batch_results, txt, lang), "batch_report.txt")
+        
+        elif video_file and model_ready:
+            sample_fps = st.session_state.get("video_fps", 2.0)
+            video_key = (hashlib.sha256(video_file.getvalue()).hexdigest(), profile['name'], st.session_state.get("conf", 0.25), st.session_state.get("nms", 0.4), floor_settings(), sample_fps)
+            job = st.session_state.get("video_job")
+            if job is None or job["key"] != video_key:
+                floor_mode, user_roi = floor_settings()
+                settings = detector_settings(video_key[2], video_key[3], floor_mode=floor_mode, user_roi=user_roi, profile=profile)
+                progress = {"done": 0, "total": 0}
+                future = get_video_executor().submit(analyse_upload, video_file.getvalue(), os.path.splitext(video_file.name)[1].lower(), settings,
+                                                     sample_fps=sample_fps, progress=lambda done, total: progress.update(done=done, total=total))
+                job = st.session_state.video_job = {"key": video_key, "future": future, "progress": progress, "t0": time.perf_counter()}
+            if not job["future"].done():
+                show_video_progress()
+            elif job["future"].exception():
+                st.error(f"{txt['video']}: {job['future'].exception()}")
+            else:
+                report = job["future"].result()
+                st.caption(f"{report['duration_s']:.0f}s of video · {report['sampled']} frames at {report['sample_fps']:.1f} fps · analysed in {report['elapsed_s']:.1f}s "
+                           f"({report['speed_x']:.1f}× real time, process pool of {report['workers']})")
+                st.markdown(f"#### {txt['video_events']}")
+                if not report["events"]: st.success(txt['safe_msg'])
+                else:
+                    st.dataframe([{"from": format_ts(ev["start_s"]), "to": format_ts(ev["end_s"]), "item": ev["label"].title(), "max count": ev["max_count"], "peak confidence": round(ev["peak_conf"], 2)} for ev in report["events"]], hide_index=True, use_container_width=True)
+                    grid = st.columns(4)
+                    for i, ev in enumerate(e for e in report["events"] if e["keyframe"]):
+                        with grid[i % 4]: st.image(ev["keyframe"], caption=f"{format_ts(ev['keyframe_s'])} · {ev['label'].title()}", use_container_width=True)
+        
+        elif live_on and model_ready:
+            if start_live:
+                if st.session_state.get("live_pipeline"): st.session_state.live_pipeline.stop()
+                floor_mode, user_roi = floor_settings()
+                # Each stream gets its own Net so it never shares one with other sessions' scans
+                live_detector = HazardDetector(st.session_state.get("conf", 0.25), st.session_state.get("nms", 0.4), floor_mode=floor_mode, user_roi=user_roi, profile=profile)
+                change_threshold = st.session_state.get("change_threshold", CHANGE_THRESHOLD)
+                st.session_state.live_pipeline = LivePipeline(live_detector, live_source.strip(), detect_every=st.session_state.get("detect_every", 5), change_threshold=change_threshold or None, target_fps=st.session_state.get("target_fps", 10) or None).start()
+            if st.session_state.get("live_pipeline"): show_live_frame()
 
-# --- TAB 3: SETTINGS ---
+# --- TAB 3: HISTORY ---
+with tab_history:
+    # Pages through the store with a (ts, id) cursor; only the visible page is read
+    f1, f2, f3 = st.columns(3)
+    room_filter = f1.selectbox(txt['room_tag'], [""] + [r for r in history.rooms() if r], format_func=lambda r: r or txt['history_all'], key="history_room")
+    label_filter = f2.selectbox(txt['history_item'], [""] + history.labels(), format_func=lambda l: l.title() or txt['history_all'], key="history_label")
+    days = f3.selectbox(txt['history_period'], [0, 1, 7, 30, 365], format_func=lambda d: txt['history_last_days'].format(d=d) if d else txt['history_all_time'], key="history_days")
+    # The period is kept as days, so reruns compare equal and the page cursors survive them
+    choice = {"room": room_filter, "label": label_filter, "days": days}
+    if st.session_state.get("history_filters") != choice:
+        st.session_state.history_filters, st.session_state.history_cursors = choice, [None]
+    cursors = st.session_state.history_cursors
+    filters = {"room": room_filter, "label": label_filter, "since": time.time() - days * 86400 if days else None}
+    rows, next_cursor = history.page(cursors[-1], **filters)
+    if not rows and len(cursors) == 1:
+        st.info(txt['history_empty'])
+    else:
+        st.dataframe([{"time": time.strftime("%Y-%m-%d %H:%M", time.localtime(r["ts"])), "room": r["room"], "status": txt[r["status"]], "hazards": r["hazards"] or "-",
+                       "hazard count": r["hazard_count"], "safe zones": r["zone_count"], "source": r["source"], "image": r["image_hash"][:12]} for r in rows], hide_index=True, use_container_width=True)
+        p1, p2, p3 = st.columns([1, 1, 4])
+        if p1.button(txt['history_newer'], disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+        if p2.button(txt['history_older'], disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
+        p3.caption(txt['history_page'].format(page=len(cursors), count=history.count(**filters)))
+        if label_filter:
+            st.markdown(f"**{txt['history_rooms_with'].format(item=label_filter.title())}**")
+            st.dataframe([{"room": r["room"] or "-", "scans": r["scans"], "last seen": time.strftime("%Y-%m-%d %H:%M", time.localtime(r["last_seen"]))} for r in history.rooms_with(label_filter, since=filters["since"])], hide_index=True, use_container_width=True)
+
+# --- TAB 4: SETTINGS ---
 with tab_settings:
     st.markdown(txt['settings_config'])
     c1, c2 = st.columns(2)
@@ -684,11 +944,44 @@ with tab_settings:
         st.markdown(txt['sensitivity'])
         st.slider("Confidence", 0.0, 1.0, 0.25, key="conf")
         st.slider("NMS Threshold", 0.0, 1.0, 0.4, key="nms")
+        st.slider(txt['preview_quality'], 40, 95, 80, key="preview_quality")
+        st.toggle(txt['tiled_scan'], value=False, key="tiled")
+        if st.session_state.get("tiled"):
+            st.slider("Tile Size", 320, 832, 416, step=32, key="tile_size")
+            st.slider("Tile Overlap", 0.0, 0.5, 0.2, key="tile_overlap")
+        floor_modes = {"off": "Whole Frame", "band": "Lower Band", "edges": "Wall/Floor Edge", "custom": "Custom ROI"}
+        st.selectbox(txt['floor_region'], list(floor_modes), format_func=floor_modes.get, key="floor_mode")
+        st.slider("Live: Detect Every N Frames", 1, 30, 5, key="detect_every")
+        st.slider("Video: Frames Analysed per Second", 0.5, 10.0, 2.0, step=0.5, key="video_fps")
+        st.slider("Live: Target Detector FPS", 0, 30, 10, key="target_fps", help="Lowers the network input size under load to hold this rate; 0 keeps it fixed")
+        st.slider("Scene Change Threshold", 0.0, 20.0, CHANGE_THRESHOLD, step=0.5, key="change_threshold", help="0 disables skipping unchanged frames")
+        if st.session_state.get("floor_mode") == "custom":
+            st.slider("ROI Horizontal", 0.0, 1.0, (0.0, 1.0), key="roi_x")
+            st.slider("ROI Vertical", 0.0, 1.0, (0.5, 1.0), key="roi_y")
     with c2:
         st.markdown(txt['alerts'])
         st.toggle(txt['enable_audio'], value=True, key="audio_on")
+        audio_stats = alert_audio.stats()
+        st.caption(f"Voice alerts: {audio_stats['hits']} played from cache · {audio_stats['misses']} not ready yet · {audio_stats['pending']} synthesizing · {audio_stats['failed']} failed")
+        cache_stats = scan_cache.stats()
+        st.caption(f"Page assets: {page_assets.rerun_bytes() / 1e3:.1f} KB of inline markup per rerun (was ~{page_assets.legacy_bytes / 1e6:.1f} MB, estimated) · static serving {'on' if page_assets.static_serving else 'off'}")
+        hist_stats = history.stats()
+        st.caption(f"History: {hist_stats['written']} scans saved in {hist_stats['batches']} batches · {hist_stats['queued']} queued · {hist_stats['lost']} lost to write errors")
+        st.caption(f"Result cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses · {cache_stats['entries']} scans · {cache_stats['bytes'] / 1e6:.1f} MB")
+        info = detector.model_info
+        if 'latency_ms' in profile: st.caption(f"Profile {profile['name']}: {profile['input_size']}px input on {profile['backend']}, {profile['latency_ms']:.0f} ms per frame (budget {LATENCY_BUDGET_MS:.0f} ms, set with TRIPSAFE_LATENCY_BUDGET_MS)")
+        if model_ready: st.caption(f"Profile {profile['name']} ({profile['input_size']}px) · model bundle {info['id']} v{info['version'] or '-'} · {'verified' if info['verified'] else 'unverified loose files'} · startup {info['startup_ms']:.0f} ms (warm-up {info['warmup_ms']:.0f} ms)")
+        svc = inference_service.stats()
+        st.caption(f"Inference pool: {svc['workers']} workers × {svc['threads_per_worker']} threads · queue {svc['queue_depth']} · p50 {svc['p50_ms']:.0f} ms / p95 {svc['p95_ms']:.0f} ms · mean batch {svc['mean_batch']:.1f}")
+        if not metrics.enabled:
+            st.caption("Timing metrics are off (TRIPSAFE_METRICS=0)")
+        elif st.toggle("Show Diagnostics", value=False, key="diagnostics"):
+            snap = metrics.snapshot()
+            st.dataframe([{"stage": stage, "count": v["count"], "mean ms": round(v["mean_ms"], 1), "p50 ms": round(v["p50_ms"], 1), "p95 ms": round(v["p95_ms"], 1), "max ms": round(v["max_ms"], 1)} for stage, v in snap["stages"].items()], hide_index=True, use_container_width=True)
+            if snap["counters"]: st.caption(" · ".join(f"{event}: {n}" for event, n in snap["counters"].items()))
+            st.download_button("Download Metrics (Prometheus)", metrics.render_prometheus(), file_name="tripsafe_metrics.prom", mime="text/plain")
 
-# --- TAB 4: INFO & SUPPORT (Merged) ---
+# --- TAB 5: INFO & SUPPORT (Merged) ---
 with tab_info:
     # 1. About Section (Full Width)
     st.markdown(f"### {txt['about_title']}")
@@ -764,3 +1057,5 @@ st.markdown("""
 </div>
 </div>
 """, unsafe_allow_html=True)
+
+metrics.observe("page_run", (time.perf_counter() - run_t0) * 1000)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The tripsafe_* modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# A checkout ships loose model files rather than a bundle
+os.environ.setdefault("TRIPSAFE_ALLOW_UNVERIFIED", "1")
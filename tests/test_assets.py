@@ -0,0 +1,19 @@
+import asyncio
+
+from tripsafe_assets import ASSET_CACHE_CONTROL, ImmutableAssetHeaders
+
+def serve(path, status=200):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": status, "headers": [(b"cache-control", b"no-cache")]})
+        await send({"type": "http.response.body", "body": b""})
+    sent = []
+    async def send(message): sent.append(message)
+    asyncio.run(ImmutableAssetHeaders(app)({"type": "http", "path": path}, None, send))
+    return dict(sent[0]["headers"])
+
+def test_hashed_assets_are_immutable():
+    assert serve("/app/static/assets/tripsafe.0123456789ab.css")[b"cache-control"] == ASSET_CACHE_CONTROL
+
+def test_other_paths_and_errors_untouched():
+    assert serve("/app/static/audio/en-0123.mp3")[b"cache-control"] == b"no-cache"
+    assert serve("/app/static/assets/missing.css", status=404)[b"cache-control"] == b"no-cache"
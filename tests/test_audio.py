@@ -0,0 +1,14 @@
+import base64
+
+from tripsafe_audio import AUDIO_URL, AlertAudio, audio_html
+
+def test_audio_tag_is_hidden_and_served_statically(tmp_path):
+    path = AlertAudio(str(tmp_path)).path_for("Caution", "English")
+    html = audio_html(path)
+    assert f'src="{AUDIO_URL}/{path.rsplit("/", 1)[-1]}"' in html
+    assert "autoplay" in html and "display:none" in html and "controls" not in html
+
+def test_audio_inlined_without_static_serving(tmp_path):
+    path = tmp_path / "a.mp3"
+    path.write_bytes(b"ID3fake")
+    assert "data:audio/mpeg;base64," + base64.b64encode(b"ID3fake").decode() in audio_html(str(path), static_serving=False)
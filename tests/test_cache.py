@@ -0,0 +1,27 @@
+from tripsafe_engine import ScanResultCache
+
+MB = 1024 * 1024
+
+def test_default_limit_evicts_least_recently_used():
+    cache = ScanResultCache()
+    assert cache.max_bytes == 64 * MB
+    for i in range(8): cache.put(i, f"scan{i}", 8 * MB)  # exactly full
+    assert cache.get(0) == "scan0"  # 0 becomes the most recent; 1 is now the oldest
+    cache.put(8, "scan8", 8 * MB)
+    assert cache.get(1) is None and cache.get(0) == "scan0" and cache.get(8) == "scan8"
+    assert cache.stats() == {"hits": 3, "misses": 1, "entries": 8, "bytes": 64 * MB}
+
+def test_several_evicted_for_one_large_entry():
+    cache = ScanResultCache(max_bytes=10)
+    for i in range(5): cache.put(i, i, 2)
+    cache.put("big", "big", 7)
+    assert [k for k in range(5) if cache.get(k) is not None] == [4]
+    assert cache.stats()["bytes"] == 9
+
+def test_replacing_a_key_and_oversized_values():
+    cache = ScanResultCache(max_bytes=10)
+    cache.put("a", 1, 4)
+    cache.put("a", 2, 6)
+    cache.put("huge", 3, 11)  # larger than the whole cache: never stored
+    assert cache.get("a") == 2 and cache.get("huge") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1, "bytes": 6}
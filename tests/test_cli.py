@@ -0,0 +1,11 @@
+import tripsafe_engine
+from tripsafe_cli import _scan_one
+from tripsafe_engine import DEFAULT_PROFILE, detector_settings, init_pool_worker
+
+def test_worker_without_model_reports_each_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(tripsafe_engine, "_pool_detector", None)
+    assert _scan_one("a.jpg") == {"file": "a.jpg", "error": "model not loaded"}
+    init_pool_worker(detector_settings(profile=dict(DEFAULT_PROFILE, dir=str(tmp_path))))
+    results = [_scan_one(name) for name in ("a.jpg", "b.jpg")]
+    assert [r["file"] for r in results] == ["a.jpg", "b.jpg"]
+    assert all(r["error"] for r in results)
@@ -0,0 +1,58 @@
+import cv2
+import numpy as np
+import pytest
+
+from tripsafe_engine import decode_yolo_outputs
+
+def legacy_decode(outs, w_img, h_img, conf_threshold):
+    # The per-row loop detect_hazards_and_zones used before vectorization
+    class_ids, confidences, boxes = [], [], []
+    for out in outs:
+        for detection in out:
+            scores = detection[5:]
+            class_id = np.argmax(scores)
+            confidence = scores[class_id]
+            if confidence > conf_threshold:
+                center_x, center_y = int(detection[0]*w_img), int(detection[1]*h_img)
+                w, h = int(detection[2]*w_img), int(detection[3]*h_img)
+                x, y = int(center_x - w/2), int(center_y - h/2)
+                boxes.append([x, y, w, h])
+                confidences.append(float(confidence))
+                class_ids.append(class_id)
+    return boxes, confidences, class_ids
+
+def random_outputs(seed):
+    # Two yolov3-tiny sized output layers (13x13 and 26x26 grids, 3 anchors, 80 classes)
+    rng = np.random.default_rng(seed)
+    outs = []
+    for n in (507, 2028):
+        out = rng.random((n, 85), dtype=np.float32)
+        out[:, 2:4] *= 0.5
+        out[:, 5:] **= 4  # mostly low class scores, like a real network
+        outs.append(out)
+    return outs
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("size", [(640, 480), (1280, 720), (417, 333)])
+def test_vectorized_decode_matches_loop(seed, size):
+    outs = random_outputs(seed)
+    boxes, confidences, class_ids = decode_yolo_outputs(outs, *size, 0.25)
+    old_boxes, old_confidences, old_class_ids = legacy_decode(outs, *size, 0.25)
+    assert len(old_boxes) > 0
+    assert boxes.tolist() == old_boxes
+    assert class_ids.tolist() == old_class_ids
+    np.testing.assert_allclose(confidences, old_confidences, rtol=0, atol=1e-7)
+
+@pytest.mark.parametrize("seed", range(3))
+def test_same_detections_survive_nms(seed):
+    outs = random_outputs(seed)
+    boxes, confidences, class_ids = decode_yolo_outputs(outs, 640, 480, 0.25)
+    old_boxes, old_confidences, old_class_ids = legacy_decode(outs, 640, 480, 0.25)
+    kept = np.array(cv2.dnn.NMSBoxes(boxes, confidences, 0.25, 0.4)).flatten()
+    old_kept = np.array(cv2.dnn.NMSBoxes(old_boxes, old_confidences, 0.25, 0.4)).flatten()
+    assert [(boxes[i].tolist(), int(class_ids[i])) for i in kept] == [(old_boxes[i], int(old_class_ids[i])) for i in old_kept]
+
+def test_nothing_above_threshold():
+    outs = [np.zeros((10, 85), np.float32)]
+    boxes, confidences, class_ids = decode_yolo_outputs(outs, 640, 480, 0.25)
+    assert boxes.shape == (0, 4) and len(confidences) == 0 and len(class_ids) == 0
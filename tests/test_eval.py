@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from tripsafe_eval import average_precision, iou_matrix, mark_pareto, match_image
+
+def test_iou_matrix():
+    a = np.array([[0.5, 0.5, 0.2, 0.2]])
+    b = np.array([[0.5, 0.5, 0.2, 0.2], [0.6, 0.5, 0.2, 0.2], [0.9, 0.9, 0.1, 0.1]])
+    np.testing.assert_allclose(iou_matrix(a, b), [[1.0, 1 / 3, 0.0]])
+
+def test_ap_hand_computed():
+    # Ranked TP, FP, TP over 2 objects: precision 1 up to recall 0.5, then 2/3 up to recall 1
+    scored = [(0.7, True), (0.9, True), (0.8, False)]
+    assert average_precision(scored, 2) == pytest.approx(0.5 * 1 + 0.5 * 2 / 3)
+    # Same detections with a third object never found: recall stops at 2/3
+    assert average_precision(scored, 3) == pytest.approx(1 / 3 * 1 + 1 / 3 * 2 / 3)
+
+def test_ap_edge_cases():
+    assert average_precision([], 2) == 0.0
+    assert average_precision([(0.9, False)], 0) is None
+    assert average_precision([(0.9, True), (0.5, True)], 2) == pytest.approx(1.0)
+
+def test_duplicate_detections_match_one_truth_box():
+    truth = [("cup", 0.5, 0.5, 0.2, 0.2)]
+    dets = [("cup", 0.6, 0.51, 0.5, 0.2, 0.2), ("cup", 0.9, 0.5, 0.5, 0.2, 0.2), ("bowl", 0.95, 0.5, 0.5, 0.2, 0.2)]
+    assert sorted(match_image(dets, truth)) == [("bowl", 0.95, False), ("cup", 0.6, False), ("cup", 0.9, True)]
+
+def test_low_iou_is_a_miss():
+    assert match_image([("cup", 0.9, 0.6, 0.5, 0.2, 0.2)], [("cup", 0.5, 0.5, 0.2, 0.2)]) == [("cup", 0.9, False)]
+
+def test_dominated_setting_dropped_from_front():
+    rows = [{"name": "fast", "map50": 0.5, "latency_p50_ms": 100}, {"name": "accurate", "map50": 0.6, "latency_p50_ms": 200},
+            {"name": "dominated", "map50": 0.4, "latency_p50_ms": 150}, {"name": "tie", "map50": 0.5, "latency_p50_ms": 100}]
+    assert [r["name"] for r in mark_pareto(rows) if r["pareto"]] == ["fast", "accurate", "tie"]
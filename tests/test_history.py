@@ -0,0 +1,30 @@
+import sqlite3
+
+from tripsafe_history import HistoryStore
+
+DET = [{"label": "cup", "confidence": 0.9, "box": [1, 2, 3, 4]}, {"label": "bed", "confidence": 0.8, "box": [0, 0, 9, 9]}]
+
+def test_pages_newest_first_without_gaps(tmp_path):
+    store = HistoryStore(str(tmp_path / "h.db"))
+    for i in range(7): store.record(f"img{i}", DET, "caution", room="hall" if i % 2 else "kitchen", ts=1000 + i)
+    store.flush()
+    seen, cursor = [], None
+    while True:
+        rows, cursor = store.page(cursor, limit=3)
+        seen += [r["image_hash"] for r in rows]
+        if cursor is None: break
+    assert seen == [f"img{i}" for i in reversed(range(7))]
+    assert store.count(room="hall") == 3 and store.count(label="cup", since=1004) == 3
+    assert rows[0]["hazards"] == "cup"
+    store.close()
+
+def test_failed_batch_is_logged_and_counted(tmp_path, caplog):
+    path = str(tmp_path / "h.db")
+    store = HistoryStore(path)
+    with sqlite3.connect(path) as conn: conn.execute("CREATE TRIGGER no_scans BEFORE INSERT ON scans BEGIN SELECT RAISE(ABORT, 'read-only'); END")
+    store.record("img", DET, "safe")
+    store.record("img2", DET, "safe")
+    store.flush()
+    assert store.stats()["lost"] == 2 and store.stats()["written"] == 0
+    assert "2 scans lost" in caplog.text
+    store.close()
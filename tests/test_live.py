@@ -0,0 +1,45 @@
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from tripsafe_live import LivePipeline
+
+class StubDetector:
+    controller = None
+
+    def detect(self, frame):
+        return {"detections": [], "hazards": [], "zones": [], "roi": None}
+
+@pytest.fixture
+def clip(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    for i in range(30): writer.write(np.full((48, 64, 3), i * 8, np.uint8))
+    writer.release()
+    return path
+
+def wait_until(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline: time.sleep(0.05)
+    return cond()
+
+def test_stops_without_a_viewer(clip):
+    pipe = LivePipeline(StubDetector(), clip, idle_timeout=0.5).start()
+    assert wait_until(lambda: not pipe.running)
+    assert "without a viewer" in pipe.error
+
+def test_keeps_running_while_polled(clip):
+    pipe = LivePipeline(StubDetector(), clip, idle_timeout=0.5).start()
+    for _ in range(15):
+        pipe.latest()
+        time.sleep(0.1)
+    assert pipe.running
+    pipe.stop()
+
+def test_new_pipeline_on_same_source_stops_the_old_one(clip):
+    old = LivePipeline(StubDetector(), clip).start()
+    new = LivePipeline(StubDetector(), clip).start()
+    assert wait_until(lambda: not old.running) and new.running
+    new.stop()
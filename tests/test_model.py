@@ -0,0 +1,20 @@
+from tripsafe_engine import MANIFEST_NAME, MODEL_DIR, build_model_bundle, load_yolo_model
+
+def test_loose_files_refused_without_dev_flag():
+    net, _, _, info = load_yolo_model(MODEL_DIR, warmup=False, allow_unverified=False)
+    assert net is None and MANIFEST_NAME in info["error"]
+
+def test_loose_files_load_unverified_with_dev_flag():
+    net, _, _, info = load_yolo_model(MODEL_DIR, warmup=False, allow_unverified=True)
+    assert net is not None and not info["verified"]
+
+def test_bundle_loads_verified(tmp_path):
+    build_model_bundle(str(tmp_path), MODEL_DIR, version=3)
+    net, _, classes, info = load_yolo_model(str(tmp_path), warmup=False, allow_unverified=False)
+    assert net is not None and info["verified"] and info["version"] == 3 and classes
+
+def test_tampered_bundle_refused(tmp_path):
+    build_model_bundle(str(tmp_path), MODEL_DIR)
+    with open(tmp_path / "coco.names", "a") as f: f.write("extra\n")
+    net, _, _, info = load_yolo_model(str(tmp_path), warmup=False)
+    assert net is None and "checksum mismatch" in info["error"]
@@ -0,0 +1,43 @@
+from tripsafe_profiles import ResolutionController
+
+def run(ctrl, cost, windows):
+    # cost(size) -> simulated forward time in ms; one timing per frame at the current size
+    for _ in range(windows * ctrl.window): ctrl.observe(cost(ctrl.size))
+    return ctrl.size
+
+def quadratic(ms_at_416):
+    return lambda size: ms_at_416 * (size / 416) ** 2
+
+def test_no_change_before_a_full_window():
+    ctrl = ResolutionController(100, window=8)
+    for _ in range(7): ctrl.observe(500)
+    assert ctrl.size == 416 and not ctrl.changes
+
+def test_steps_down_to_the_size_that_fits():
+    ctrl = ResolutionController(100)
+    assert run(ctrl, quadratic(160), 1) == 320
+    assert ctrl.changes[0][1:3] == (416, 320) and "over" in ctrl.reason
+
+def test_always_steps_at_least_once_when_slightly_over():
+    ctrl = ResolutionController(100)
+    assert run(ctrl, quadratic(101), 1) == 384
+
+def test_holds_inside_the_headroom_band():
+    # 320 px costs ~95 ms: under the 100 ms target but above 70 % of it, so it neither grows nor shrinks
+    ctrl = ResolutionController(100)
+    run(ctrl, quadratic(160), 1)
+    changes = len(ctrl.changes)
+    assert run(ctrl, quadratic(160), 20) == 320 and len(ctrl.changes) == changes
+
+def test_recovers_one_step_at_a_time_when_load_drops():
+    ctrl = ResolutionController(100)
+    run(ctrl, quadratic(160), 1)
+    assert run(ctrl, quadratic(80), 1) == 352
+    assert run(ctrl, quadratic(80), 10) == 416
+    assert [c[2] for c in ctrl.changes] == [320, 352, 384, 416]
+    assert all("under" in c[3] for c in ctrl.changes[1:])
+
+def test_clamped_to_min_and_max_size():
+    ctrl = ResolutionController(100)
+    assert run(ctrl, quadratic(10000), 5) == 224
+    assert run(ctrl, quadratic(1), 20) == 608
@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from tripsafe_server import DetectionServer, HttpError
+
+def read(raw, max_body=1024):
+    async def go():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await DetectionServer(None, max_body=max_body).read_request(reader)
+    return asyncio.run(go())
+
+def post(length):
+    return b"POST /detect HTTP/1.1\r\nHost: x\r\nContent-Length: " + length + b"\r\n\r\nabcd"
+
+def test_body_read_to_content_length():
+    assert read(post(b"4")) == ("POST", "/detect", {"host": "x", "content-length": "4"}, b"abcd")
+
+def test_missing_content_length_means_no_body():
+    assert read(b"GET /health HTTP/1.1\r\n\r\n")[3] == b""
+
+@pytest.mark.parametrize("length", [b"abc", b"-1", b"4.0", b"+4", b"1_0", b"0x4", b"\xb2"])
+def test_bad_content_length_is_400(length):
+    with pytest.raises(HttpError) as e: read(post(length))
+    assert e.value.status == 400
+
+def test_oversized_content_length_is_413():
+    with pytest.raises(HttpError) as e: read(post(b"1025"))
+    assert e.value.status == 413
@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from tripsafe_engine import load_yolo_model, run_yolo_forward
+from tripsafe_service import InferenceService
+
+@pytest.fixture(scope="module")
+def service():
+    svc = InferenceService(workers=1)
+    if not svc.ready: pytest.skip(svc.model_info.get("error", "model not available"))
+    yield svc
+    svc.shutdown()
+
+def test_matches_direct_forward(service):
+    net, output_layers, _, _ = load_yolo_model(warmup=False)
+    img = np.random.default_rng(0).integers(0, 255, (240, 320, 3), dtype=np.uint8)
+    direct = run_yolo_forward(img, net, output_layers)
+    np.testing.assert_allclose(service.forward(img), direct, atol=1e-4)
+
+def test_submit_without_model_fails_fast(tmp_path):
+    svc = InferenceService(workers=1, model_dir=str(tmp_path))
+    assert not svc.ready
+    with pytest.raises(RuntimeError, match="missing model file"):
+        svc.submit(np.zeros((8, 8, 3), np.uint8)).result(timeout=1)
+
+def test_shutdown_leaves_no_future_pending():
+    svc = InferenceService(workers=1, max_batch=1)
+    if not svc.ready: pytest.skip("model not available")
+    img = np.zeros((64, 64, 3), np.uint8)
+    futures = [svc.submit(img) for _ in range(50)]
+    svc.shutdown()
+    assert all(f.done() for f in futures)
+    assert any(isinstance(f.exception(), RuntimeError) for f in futures)
+    with pytest.raises(RuntimeError):
+        svc.submit(img).result(timeout=1)
+
+def test_submit_racing_shutdown_never_strands_a_future():
+    svc = InferenceService(workers=1)
+    if not svc.ready: pytest.skip("model not available")
+    img, futures = np.zeros((32, 32, 3), np.uint8), []
+    def client():
+        for _ in range(200): futures.append(svc.submit(img))
+    threads = [threading.Thread(target=client) for _ in range(4)]
+    for t in threads: t.start()
+    svc.shutdown()
+    for t in threads: t.join()
+    for f in futures: f.exception(timeout=5)  # raises TimeoutError if a future was stranded
+
+def test_forward_wait_is_bounded(tmp_path):
+    svc = InferenceService(workers=1, model_dir=str(tmp_path))
+    pending = Future()
+    with pytest.raises(RuntimeError, match="did not finish"): svc._result(pending, 0.05)
+    assert pending.cancelled()
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from tripsafe_engine import make_tiles, map_rows_to_image, run_tiled_forward
+
+@pytest.mark.parametrize("w,h", [(1920, 1440), (1000, 416), (417, 833)])
+def test_tiles_cover_image_with_overlap(w, h):
+    tiles = make_tiles(w, h, 416, 0.2)
+    covered = np.zeros((h, w), bool)
+    for x, y, tw, th in tiles:
+        assert tw == 416 and th == 416 and x + tw <= w and y + th <= h
+        covered[y:y + th, x:x + tw] = True
+    assert covered.all()
+    xs = sorted({t[0] for t in tiles})
+    assert xs[0] == 0 and xs[-1] == w - 416  # edge tiles sit flush with the image edge
+    assert all(b - a <= 416 * 0.8 + 1 for a, b in zip(xs, xs[1:]))  # neighbours overlap by at least 20 %
+
+def test_image_smaller_than_tile_is_one_tile():
+    assert make_tiles(300, 200, 416, 0.2) == [(0, 0, 300, 200)]
+
+def test_rows_map_back_to_image_coordinates():
+    w, h = 1000, 416
+    tiles = make_tiles(w, h, 416, 0.2)
+    edge = tiles[-1]
+    # One box in the middle of the last (right-edge) tile, a quarter of the tile wide and tall
+    rows = np.zeros((1, 1, 85), np.float32)
+    rows[0, 0, :4] = [0.5, 0.5, 0.25, 0.25]
+    cx, cy, bw, bh = map_rows_to_image(rows, [edge], w, h)[0, :4]
+    assert (cx * w, cy * h, bw * w, bh * h) == pytest.approx((edge[0] + 208, 208, 104, 104))
+    assert edge[0] + edge[2] == w
+
+class RecordingNet:
+    def __init__(self): self.sizes = []
+
+    def setInput(self, blob): self.blob = blob
+
+    def forward(self, layers):
+        self.sizes.append(self.blob.shape[2:])
+        return [np.zeros((self.blob.shape[0], 3, 85), np.float32)]
+
+def test_tiles_run_at_tile_size_not_profile_size():
+    net = RecordingNet()
+    rows = run_tiled_forward(np.zeros((900, 1200, 3), np.uint8), net, ["out"], tile_size=416, overlap=0.2, input_size=608)
+    assert net.sizes == [(608, 608), (416, 416)]
+    assert len(rows) == 3 * (1 + len(make_tiles(1200, 900, 416, 0.2)))
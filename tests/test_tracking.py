@@ -0,0 +1,76 @@
+import numpy as np
+
+from tripsafe_tracking import ChangeGate, HazardTracker
+
+def scene(x, y=100, size=40):
+    # Flat background with one textured 40x40 "hazard" at (x, y)
+    frame = np.full((240, 320, 3), 90, np.uint8)
+    yy, xx = np.mgrid[0:size, 0:size]
+    frame[y:y + size, x:x + size] = (((yy // 5 + xx // 5) % 2) * 200 + 30)[..., None]
+    return frame
+
+class BoxDetector:
+    # Stands in for HazardDetector: reports the hazard where the current frame has it
+    def __init__(self): self.x, self.calls = 0, 0
+
+    def detect(self, frame):
+        self.calls += 1
+        return {"detections": [{"label": "cup", "confidence": 0.9, "box": [self.x, 100, 40, 40]}], "roi": None}
+
+def test_gate_sees_small_object_moving():
+    gate = ChangeGate()
+    assert gate.changed(scene(20))
+    assert not gate.changed(scene(20))
+    assert gate.changed(scene(60))  # a 40 px box moving 40 px is ~1 % of the mean over the frame
+
+def test_gated_tracker_follows_moving_object():
+    detector = BoxDetector()
+    tracker = HazardTracker(detector, detect_every=5, gate=ChangeGate())
+    for i in range(60):
+        detector.x = 20 + 3 * i
+        box = tracker.update(scene(detector.x))["detections"][0]["box"]
+        assert abs(box[0] - detector.x) <= 4  # boxes move on skipped frames too
+    assert detector.calls >= 10
+
+def test_gated_tracker_skips_detector_on_static_scene():
+    detector = BoxDetector()
+    tracker = HazardTracker(detector, detect_every=5, gate=ChangeGate())
+    for _ in range(60): result = tracker.update(scene(20))
+    assert detector.calls == 1 and tracker.gate.skip_rate > 0.9 and result["mode"] in ("track", "gated")
+
+class FollowingDetector(BoxDetector):
+    # Reports the hazard at its true position and records which frames it ran on
+    def __init__(self):
+        super().__init__()
+        self.frames, self.frame = [], 0
+
+    def detect(self, frame):
+        self.frames.append(self.frame)
+        return super().detect(frame)
+
+def test_detector_runs_every_n_frames():
+    detector = FollowingDetector()
+    tracker = HazardTracker(detector, detect_every=5)
+    for i in range(23):
+        detector.frame = i
+        tracker.update(scene(20))
+    assert detector.frames == [0, 5, 10, 15, 20]
+    stats = tracker.stats()
+    assert stats["frames"] == 23 and stats["detector_runs"] == 5
+
+def test_track_id_stable_while_object_moves():
+    detector = FollowingDetector()
+    tracker = HazardTracker(detector, detect_every=4)
+    ids = set()
+    for i in range(40):
+        detector.x = 20 + 4 * i
+        ids |= {d["id"] for d in tracker.update(scene(detector.x))["detections"]}
+    assert ids == {1} and len(detector.frames) == 10
+
+def test_new_object_gets_new_id():
+    detector = FollowingDetector()
+    tracker = HazardTracker(detector, detect_every=1)
+    detector.x = 20
+    first = tracker.update(scene(20))["detections"][0]["id"]
+    detector.x = 250  # far away: no IoU overlap with the old track
+    assert tracker.update(scene(250))["detections"][0]["id"] != first
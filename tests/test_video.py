@@ -0,0 +1,45 @@
+import glob
+import os
+import tempfile
+
+import cv2
+import numpy as np
+import pytest
+
+from tripsafe_video import add_sighting, analyse_upload, merge_events, plan_segments
+
+@pytest.mark.parametrize("frames,step,segments", [(100, 3, 4), (7, 2, 10), (1, 15, 2), (90, 1, 7)])
+def test_segments_cover_every_sampled_frame_once(frames, step, segments):
+    plan = plan_segments(frames, step, segments)
+    assert plan[0][0] == 0 and plan[-1][1] == frames
+    assert all(a[1] == b[0] for a, b in zip(plan, plan[1:]))
+    assert all(start % step == 0 for start, _ in plan)
+    sampled = [i for start, end in plan for i in range(start, end) if i % step == 0]
+    assert sampled == list(range(0, frames, step))
+
+def test_sightings_join_within_gap_and_merge_across_segments():
+    first, second = [], []
+    for t, conf in ((0.0, 0.4), (0.5, 0.9), (1.0, 0.5)): add_sighting(first, "cup", t, 1, conf, max_gap=1.0)
+    add_sighting(first, "cup", 5.0, 2, 0.3, max_gap=1.0)  # too late: a new event
+    add_sighting(second, "cup", 5.5, 1, 0.8, max_gap=1.0)  # next segment, touches the 5.0 event
+    assert [(e["start_s"], e["end_s"], e["keyframe_s"]) for e in first] == [(0.0, 1.0, 0.5), (5.0, 5.0, 5.0)]
+    merged = merge_events(first + second, max_gap=1.0)
+    assert [(e["start_s"], e["end_s"], e["frames"], e["max_count"], e["keyframe_s"]) for e in merged] == [(0.0, 1.0, 3, 1, 0.5), (5.0, 5.5, 2, 2, 5.5)]
+
+def spooled():
+    return set(glob.glob(os.path.join(tempfile.gettempdir(), "tripsafe_*.mp4")))
+
+def test_upload_temp_file_removed_after_failure():
+    before = spooled()
+    with pytest.raises(ValueError): analyse_upload(b"not a video", ".mp4")
+    assert spooled() == before
+
+def test_upload_analysed_and_temp_file_removed(tmp_path):
+    src = str(tmp_path / "walk.mp4")
+    writer = cv2.VideoWriter(src, cv2.VideoWriter_fourcc(*"mp4v"), 10, (96, 64))
+    for i in range(20): writer.write(np.full((64, 96, 3), i * 10, np.uint8))
+    writer.release()
+    before = spooled()
+    with open(src, "rb") as f: report = analyse_upload(f.read(), ".mp4", sample_fps=5, workers=1)
+    assert report["frames"] == 20 and report["sampled"] == 10
+    assert spooled() == before
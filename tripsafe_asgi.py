@@ -0,0 +1,16 @@
+# ==============================================================================
+# "TripSafe AI: ASGI Entry Point"
+# The same Streamlit app, run under an ASGI server so that the content-hashed
+# files in static/assets are sent with a one-year immutable Cache-Control:
+#   pip install uvicorn && uvicorn tripsafe_asgi:app --host 0.0.0.0 --port 8501
+# `streamlit run streamlit_app.py` still works, without those headers.
+# ==============================================================================
+
+import os
+
+import streamlit as st
+from starlette.middleware import Middleware
+
+from tripsafe_assets import APP_DIR, ImmutableAssetHeaders
+
+app = st.App(os.path.join(APP_DIR, "streamlit_app.py"), middleware=[Middleware(ImmutableAssetHeaders)])
@@ -0,0 +1,100 @@
+# ==============================================================================
+# "TripSafe AI: Static Assets"
+# The logo and page CSS are built once per process into content-hashed files
+# under static/assets, which Streamlit serves at app/static/... when
+# server.enableStaticServing is on (.streamlit/config.toml). Pages then carry a
+# short URL instead of megabytes of inline base64 on every rerun.
+# Plain `streamlit run` serves app/static without a long-lived Cache-Control
+# header, so browsers revalidate each file; run through tripsafe_asgi (uvicorn)
+# to serve the hashed assets as immutable for a year.
+# ==============================================================================
+
+import base64
+import hashlib
+import os
+from io import BytesIO
+
+from PIL import Image
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSET_DIR = os.path.join(APP_DIR, "static", "assets")
+ASSET_URL = "app/static/assets"
+LOGO_SIZES = (80, 160)  # 1x and 2x of the 80 px display size
+LOGO_FALLBACK_URL = "http://googleusercontent.com/image_generation_content/3"
+ASSET_CACHE_CONTROL = b"public, max-age=31536000, immutable"
+
+def hashed_name(stem, data, ext):
+    # The hash changes with the content, so a browser can keep any version it has fetched
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+def write_asset(name, data, asset_dir=ASSET_DIR):
+    path = os.path.join(asset_dir, name)
+    if not os.path.exists(path):
+        os.makedirs(asset_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f: f.write(data)
+        os.replace(tmp, path)
+    return name
+
+def logo_variants(path, sizes=LOGO_SIZES):
+    # {size: png_bytes}; each variant is a square thumbnail of the source logo
+    variants = {}
+    with Image.open(path) as src:
+        src.load()
+        for size in sizes:
+            img = src.copy()
+            img.thumbnail((size, size), Image.LANCZOS)
+            buf = BytesIO()
+            img.save(buf, format="PNG", optimize=True)
+            variants[size] = buf.getvalue()
+    return variants
+
+class ImmutableAssetHeaders:
+    # ASGI middleware: successful responses under app/static/assets get ASSET_CACHE_CONTROL.
+    # Only safe because every file written there has its content hash in the name.
+    def __init__(self, app, marker="/" + ASSET_URL + "/"):
+        self.app, self.marker = app, marker
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.marker not in scope["path"]: return await self.app(scope, receive, send)
+
+        async def send_cached(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = [(k, v) for k, v in message.get("headers", []) if k.lower() != b"cache-control"]
+                message = dict(message, headers=headers + [(b"cache-control", ASSET_CACHE_CONTROL)])
+            await send(message)
+        await self.app(scope, receive, send_cached)
+
+class PageAssets:
+    def __init__(self, logo_path, css, static_serving=True, asset_dir=ASSET_DIR):
+        self.static_serving = static_serving
+        # Estimate of what the page used to send on every rerun: the raw logo base64 twice plus the
+        # inline CSS, computed from the file size rather than measured
+        legacy_logo = 4 * ((os.path.getsize(logo_path) + 2) // 3) if os.path.exists(logo_path) else 0
+        self.legacy_bytes = 2 * legacy_logo + len(css.encode("utf-8"))
+
+        self.logo = {}
+        try:
+            variants = logo_variants(logo_path)
+        except OSError:
+            variants = {}
+        for size, data in variants.items():
+            if static_serving:
+                self.logo[size] = f"{ASSET_URL}/{write_asset(hashed_name('logo', data, '.png'), data, asset_dir)}"
+            else:
+                self.logo[size] = "data:image/png;base64," + base64.b64encode(data).decode()
+
+        css_bytes = css.encode("utf-8")
+        if static_serving:
+            self.css_html = f"<style>@import url('{ASSET_URL}/{write_asset(hashed_name('tripsafe', css_bytes, '.css'), css_bytes, asset_dir)}');</style>"
+        else:
+            self.css_html = f"<style>{css}</style>"
+
+    def logo_img(self, css_class="interactive-logo", style="width: 80px;"):
+        if not self.logo: return f'<img src="{LOGO_FALLBACK_URL}" class="{css_class}" style="{style}">'
+        small, large = self.logo[min(self.logo)], self.logo[max(self.logo)]
+        return f'<img src="{small}" srcset="{small} 1x, {large} 2x" class="{css_class}" style="{style}">'
+
+    def rerun_bytes(self, logo_count=2):
+        # Asset markup one script run sends now, to compare with legacy_bytes
+        return len(self.css_html.encode("utf-8")) + logo_count * len(self.logo_img().encode("utf-8"))
@@ -0,0 +1,99 @@
+# ==============================================================================
+# "TripSafe AI: Voice Alerts"
+# Spoken alerts play from MP3 files cached on disk. The fixed alert phrases are
+# synthesized with gTTS on a background thread; a phrase that is not cached yet
+# is queued and skipped for that alert, so a scan never waits on the network.
+# Offline installs can ship a pre-filled static/audio directory.
+# ==============================================================================
+
+import base64
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tripsafe_metrics import metrics
+
+# --- Try Importing gTTS for Audio Alerts ---
+try:
+    from gtts import gTTS
+    AUDIO_AVAILABLE = True
+except ImportError:
+    AUDIO_AVAILABLE = False
+
+AUDIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "audio")
+AUDIO_URL = "app/static/audio"
+GTTS_LANGS = {"English": "en", "Hindi": "hi"}
+PRERENDER_MAX_COUNT = 10  # high-risk alerts are pre-rendered for 1..N hazards
+RETRY_AFTER = 300  # seconds before a failed phrase (e.g. offline) is tried again
+
+def alert_phrases(languages, max_count=PRERENDER_MAX_COUNT):
+    # (text, lang_code) for every fixed alert in every language
+    phrases = []
+    for lang_code, txt in languages.items():
+        phrases += [(txt["high_risk_msg"].format(count=n), lang_code) for n in range(1, max_count + 1)]
+        phrases.append((txt["caution_msg"].format(count=0), lang_code))
+    return phrases
+
+def audio_html(path, static_serving=True):
+    # Hidden autoplaying <audio> tag: the file is served from static/audio, or inlined when
+    # static serving is off. st.audio would draw a visible player for every alert.
+    if static_serving: src = f"{AUDIO_URL}/{os.path.basename(path)}"
+    else:
+        with open(path, "rb") as f: src = "data:audio/mpeg;base64," + base64.b64encode(f.read()).decode()
+    return f'<audio autoplay src="{src}" style="display:none"></audio>'
+
+class AlertAudio:
+    def __init__(self, cache_dir=AUDIO_DIR):
+        self.cache_dir = cache_dir
+        self._pool = ThreadPoolExecutor(1, thread_name_prefix="tts")
+        self._lock = threading.Lock()
+        self._pending, self._failed = set(), {}
+        self.hits = self.misses = self.synthesized = 0
+
+    def path_for(self, text, lang_code="English"):
+        lang = GTTS_LANGS.get(lang_code, "en")
+        return os.path.join(self.cache_dir, f"{lang}-{hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]}.mp3")
+
+    def get(self, text, lang_code="English"):
+        # Path of the cached MP3, or None after queueing the phrase for synthesis
+        path = self.path_for(text, lang_code)
+        hit = os.path.exists(path)
+        with self._lock:
+            if hit: self.hits += 1
+            else: self.misses += 1
+        metrics.count("tts_cache_hit" if hit else "tts_cache_miss")
+        if hit: return path
+        self.request(text, lang_code)
+        return None
+
+    def request(self, text, lang_code="English"):
+        path = self.path_for(text, lang_code)
+        with self._lock:
+            if not AUDIO_AVAILABLE or path in self._pending or os.path.exists(path): return
+            if time.time() - self._failed.get(path, 0) < RETRY_AFTER: return
+            self._pending.add(path)
+        self._pool.submit(self._synthesize, text, GTTS_LANGS.get(lang_code, "en"), path)
+
+    def prerender(self, phrases):
+        for text, lang_code in phrases: self.request(text, lang_code)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "synthesized": self.synthesized, "pending": len(self._pending), "failed": len(self._failed)}
+
+    def _synthesize(self, text, lang, path):
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with metrics.timer("tts_synthesis"): gTTS(text=text, lang=lang).save(tmp)
+            os.replace(tmp, path)  # readers never see a half-written file
+            with self._lock:
+                self.synthesized += 1
+                self._failed.pop(path, None)
+        except Exception:
+            with self._lock: self._failed[path] = time.time()
+            if os.path.exists(tmp): os.remove(tmp)
+        finally:
+            with self._lock: self._pending.discard(path)
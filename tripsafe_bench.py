@@ -0,0 +1,143 @@
+# ==============================================================================
+# "TripSafe AI: Pipeline Benchmark"
+# Offline, per-stage timings of the single-image scan path on a fixed image set
+# (the bundled logo plus generated room scenes at several resolutions), e.g.:
+#   python tripsafe_bench.py --out bench.json
+#   python tripsafe_bench.py --out new.json --compare bench.json --threshold 0.15
+# ==============================================================================
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from tripsafe_engine import (
+    INPUT_SIZE, MODEL_DIR, decode_image_bytes, detect_hazards_and_zones, generate_report,
+    get_placement_suggestions, load_yolo_model, make_blob, render_display_image, risk_level,
+)
+
+STAGES = ("decode", "blob", "forward", "postprocess", "draw", "report")
+SCENE_SIZES = ((640, 480), (1280, 720), (1920, 1080), (4032, 3024))
+BUNDLED_IMAGES = ("triphazard.png",)
+
+def synthetic_scene(w, h, seed=0):
+    # Deterministic stand-in for a room photo: wall/floor gradient with scattered objects, as JPEG
+    rng = np.random.default_rng(seed)
+    img = np.empty((h, w, 3), np.uint8)
+    img[:] = np.linspace(200, 90, h, dtype=np.uint8)[:, None, None]
+    for _ in range(12):
+        x, y = int(rng.integers(0, w)), int(rng.integers(h // 2, h))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        if rng.random() < 0.5: cv2.rectangle(img, (x, y), (x + w // 10, y + h // 12), color, -1)
+        else: cv2.circle(img, (x, y), max(4, h // 20), color, -1)
+    img = cv2.add(img, rng.integers(0, 12, img.shape, dtype=np.uint8))
+    return cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+def benchmark_images(bundled_dir=MODEL_DIR):
+    images = []
+    for name in BUNDLED_IMAGES:
+        path = os.path.join(bundled_dir, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f: images.append((name, f.read()))
+    images += [(f"scene_{w}x{h}.jpg", synthetic_scene(w, h, seed=i)) for i, (w, h) in enumerate(SCENE_SIZES)]
+    return images
+
+def time_stages(data, net, output_layers, classes, conf, nms, input_size):
+    # One scan, split at the same points the app's pipeline has
+    t = [time.perf_counter()]
+    img, _ = decode_image_bytes(data)
+    t.append(time.perf_counter())
+    blob = make_blob(img, input_size)
+    t.append(time.perf_counter())
+    net.setInput(blob)
+    outs = net.forward(output_layers)
+    rows = np.concatenate([o.reshape(-1, o.shape[-1]) for o in outs], axis=0)
+    t.append(time.perf_counter())
+    detections, hazards, zones, risk_list = detect_hazards_and_zones(img, net, output_layers, classes, conf, nms, outs=rows)
+    t.append(time.perf_counter())
+    render_display_image(img, detections)
+    t.append(time.perf_counter())
+    generate_report(hazards, get_placement_suggestions(hazards, zones), risk_level(hazards, risk_list)[0])
+    t.append(time.perf_counter())
+    return {stage: (t[i + 1] - t[i]) * 1000 for i, stage in enumerate(STAGES)}, len(detections)
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {"median_ms": float(np.median(samples)), "p90_ms": float(np.percentile(samples, 90)), "mean_ms": float(np.mean(samples)), "min_ms": samples[0]}
+
+def run_benchmark(runs=10, warmup=2, conf=0.25, nms=0.4, input_size=INPUT_SIZE, model_dir=None):
+    net, output_layers, classes, info = load_yolo_model(model_dir, input_size=input_size)
+    if net is None: raise RuntimeError(f"model could not be loaded: {info['error']}")
+    results = {}
+    for name, data in benchmark_images():
+        for _ in range(warmup): time_stages(data, net, output_layers, classes, conf, nms, input_size)
+        samples = {stage: [] for stage in STAGES + ("total",)}
+        for _ in range(runs):
+            stages, n_detections = time_stages(data, net, output_layers, classes, conf, nms, input_size)
+            for stage, ms in stages.items(): samples[stage].append(ms)
+            samples["total"].append(sum(stages.values()))
+        shape = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR).shape
+        results[name] = {"size": [shape[1], shape[0]], "bytes": len(data), "detections": n_detections,
+                         "stages": {stage: summarize(s) for stage, s in samples.items()}}
+    meta = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "host": platform.node(), "cpus": os.cpu_count(),
+        "python": platform.python_version(), "opencv": cv2.__version__, "numpy": np.__version__,
+        "model": info["id"], "model_version": info["version"], "input_size": input_size,
+        "runs": runs, "warmup": warmup, "conf": conf, "nms": nms,
+    }
+    return {"meta": meta, "results": results}
+
+def compare(current, baseline, threshold=0.15, min_delta_ms=0.5):
+    # A stage regresses when its median is both threshold x slower and min_delta_ms slower than
+    # the baseline; the absolute floor keeps sub-millisecond noise from failing a run
+    rows = []
+    for name, res in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None: continue
+        for stage, stats in res["stages"].items():
+            if stage not in base["stages"]: continue
+            old, new = base["stages"][stage]["median_ms"], stats["median_ms"]
+            ratio = new / old if old else float("inf")
+            regressed = ratio > 1 + threshold and new - old > min_delta_ms
+            rows.append({"image": name, "stage": stage, "baseline_ms": old, "current_ms": new, "ratio": ratio, "regressed": regressed})
+    return rows
+
+def print_results(report):
+    print(f"{'image':<24}" + "".join(f"{s:>12}" for s in STAGES + ("total",)))
+    for name, res in report["results"].items():
+        print(f"{name:<24}" + "".join(f"{res['stages'][s]['median_ms']:>12.2f}" for s in STAGES + ("total",)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="tripsafe_bench", description="Per-stage benchmark of the TripSafe scan pipeline")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown before a stage counts as regressed")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--input-size", type=int, default=INPUT_SIZE)
+    parser.add_argument("--model-dir", help="model bundle to benchmark")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.runs, args.warmup, input_size=args.input_size, model_dir=args.model_dir)
+    print_results(report)
+    if args.out:
+        with open(args.out, "w") as f: json.dump(report, f, indent=2)
+    if not args.compare: return 0
+
+    with open(args.compare) as f: baseline = json.load(f)
+    if baseline["meta"].get("host") != report["meta"]["host"] or baseline["meta"].get("input_size") != report["meta"]["input_size"]:
+        print("Warning: baseline was recorded on a different host or input size", file=sys.stderr)
+    rows = compare(report, baseline, args.threshold)
+    regressions = [r for r in rows if r["regressed"]]
+    for r in regressions:
+        print(f"REGRESSION {r['image']} {r['stage']}: {r['baseline_ms']:.2f} -> {r['current_ms']:.2f} ms ({r['ratio']:.2f}x)", file=sys.stderr)
+    print(f"{len(regressions)} regressions in {len(rows)} stage timings (threshold {args.threshold:.0%})", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+# ==============================================================================
+# "TripSafe AI: Command Line Scanner"
+# Bulk re-scans without the web UI, e.g.:
+#   python tripsafe_cli.py scan photos/ --out results.json
+#   python tripsafe_cli.py scan site_a/ site_b/ --recursive --out results.csv --workers 8
+#   python tripsafe_cli.py bundle --out models/yolov3-tiny-416 --version 2
+#   python tripsafe_cli.py calibrate --budget 150
+#   python tripsafe_cli.py video walkthrough.mp4 --sample-fps 2 --out timeline.json --keyframes frames/
+# ==============================================================================
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from tripsafe_engine import (
+    ALLOW_UNVERIFIED, BUNDLE_DIR, MANIFEST_NAME, MODEL_DIR, IMAGE_EXTS, ModelBundleError,
+    build_model_bundle, detector_settings, find_model_dir, init_pool_worker, load_yolo_model, pool_detector,
+)
+from tripsafe_profiles import CALIBRATION_FILE, LATENCY_BUDGET_MS, calibrated_profiles, choose_profile
+from tripsafe_video import SAMPLE_FPS, analyse_video, format_ts
+
+def settings_from_args(args):
+    return detector_settings(args.conf, args.nms, (args.tile_size, args.tile_overlap) if args.tiled else None, args.floor)
+
+def _scan_one(path):
+    # A worker whose Net failed to load reports every file as failed instead of aborting the batch
+    detector = pool_detector()
+    if detector is None or not detector.ready:
+        return {"file": path, "error": (detector.model_info.get("error") if detector else None) or "model not loaded"}
+    try:
+        result = detector.scan_file(path)
+    except OSError as e:
+        return {"file": path, "error": str(e)}
+    if result is None: return {"file": path, "error": "could not decode image"}
+    result["file"] = path
+    return result
+
+def check_model():
+    # Fails once in the parent rather than in every worker, and says so when loose files are used
+    model_dir = find_model_dir()
+    if os.path.exists(os.path.join(model_dir, MANIFEST_NAME)): return True
+    if not ALLOW_UNVERIFIED:
+        print(f"No verified model bundle at {BUNDLE_DIR}; build one with `python tripsafe_cli.py bundle` "
+              "(or set TRIPSAFE_ALLOW_UNVERIFIED=1 for development).", file=sys.stderr)
+        return False
+    print(f"Warning: using unverified model files from {model_dir} (TRIPSAFE_ALLOW_UNVERIFIED is set).", file=sys.stderr)
+    return True
+
+def find_images(paths, recursive=False):
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTS): yield os.path.join(root, name)
+            if not recursive: break
+            dirs.sort()
+
+def write_json(results, out):
+    json.dump(results, out, indent=2)
+
+def write_csv(results, out):
+    # One row per image; full per-box detail is in the JSON output
+    writer = csv.writer(out)
+    writer.writerow(["file", "status", "hazard_count", "hazards", "safe_zones", "ms", "error"])
+    for r in results:
+        if "error" in r:
+            writer.writerow([r["file"], "", "", "", "", "", r["error"]])
+        else:
+            writer.writerow([r["file"], r["risk"], len(r["hazards"]), "; ".join(r["hazards"]), "; ".join(r["zones"]), f"{r['ms']:.1f}", ""])
+
+def cmd_scan(args):
+    files = list(find_images(args.paths, args.recursive))
+    if not files:
+        print("No images found.", file=sys.stderr)
+        return 1
+    if not check_model(): return 1
+
+    t0, results = time.perf_counter(), []
+    with ProcessPoolExecutor(args.workers, initializer=init_pool_worker, initargs=(settings_from_args(args),)) as pool:
+        for r in pool.map(_scan_one, files, chunksize=4):
+            results.append(r)
+            print(f"[{len(results)}/{len(files)}] {r['file']}: {r.get('risk', r.get('error'))}", file=sys.stderr)
+    elapsed = time.perf_counter() - t0
+
+    writer = write_csv if args.out and args.out.lower().endswith(".csv") else write_json
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as f: writer(results, f)
+    else:
+        writer(results, sys.stdout)
+    print(f"Scanned {len(files)} images in {elapsed:.1f}s ({len(files) / elapsed:.2f} images/s)", file=sys.stderr)
+    return 0
+
+def cmd_bundle(args):
+    # Packs local model files into a verified bundle, then loads it once to report startup cost
+    try:
+        manifest = build_model_bundle(args.out, args.src, version=args.version)
+    except (ModelBundleError, OSError) as e:
+        print(f"Bundle failed: {e}", file=sys.stderr)
+        return 1
+    for entry in manifest["files"].values(): print(f"  {entry['name']}: {entry['bytes']} bytes, sha256 {entry['sha256']}", file=sys.stderr)
+    net, _, _, info = load_yolo_model(args.out)
+    if net is None:
+        print(f"Bundle written to {args.out} but failed to load: {info['error']}", file=sys.stderr)
+        return 1
+    print(f"Bundle {manifest['id']} v{manifest['version']} written to {args.out}; startup {info['startup_ms']:.0f} ms "
+          f"(verify {info['verify_ms']:.0f} ms, load {info['load_ms']:.0f} ms, warm-up {info['warmup_ms']:.0f} ms)", file=sys.stderr)
+    return 0
+
+def cmd_calibrate(args):
+    profiles = calibrated_profiles(args.out, recalibrate=not args.cached)
+    if not profiles:
+        print("No model profile could be loaded.", file=sys.stderr)
+        return 1
+    chosen = choose_profile(profiles, args.budget)
+    for p in sorted(profiles, key=lambda p: p["latency_ms"]):
+        print(f"{'*' if p is chosen else ' '} {p['name']:<28} {p['latency_ms']:8.1f} ms")
+    print(f"Budget {args.budget:.0f} ms -> {chosen['name']} ({chosen['latency_ms']:.1f} ms); timings saved to {args.out}", file=sys.stderr)
+    return 0
+
+def cmd_video(args):
+    if not check_model(): return 1
+    progress = lambda done, total: print(f"[{done}/{total}] segments done", file=sys.stderr)
+    try:
+        report = analyse_video(args.video, settings_from_args(args), args.sample_fps, args.workers, args.segments, progress=progress)
+    except ValueError as e:
+        print(f"Video analysis failed: {e}", file=sys.stderr)
+        return 1
+    if args.keyframes: os.makedirs(args.keyframes, exist_ok=True)
+    for i, ev in enumerate(report["events"]):
+        jpeg = ev.pop("keyframe")
+        if args.keyframes and jpeg:
+            ev["keyframe_file"] = os.path.join(args.keyframes, f"{i:03d}_{ev['label'].replace(' ', '_')}_{ev['keyframe_s']:.1f}s.jpg")
+            with open(ev["keyframe_file"], "wb") as f: f.write(jpeg)
+        print(f"{format_ts(ev['start_s'])} - {format_ts(ev['end_s'])}  {ev['label']:<14} x{ev['max_count']}  peak {ev['peak_conf']:.2f}", file=sys.stderr)
+    if args.out:
+        with open(args.out, "w") as f: json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    print(f"{len(report['events'])} hazard events in {report['duration_s']:.1f}s of video; {report['sampled']} frames sampled at {report['sample_fps']:.1f} fps "
+          f"in {report['elapsed_s']:.1f}s ({report['speed_x']:.1f}x real time, {report['workers']} workers)", file=sys.stderr)
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="tripsafe_cli", description="TripSafe AI headless hazard scanner")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    scan = sub.add_parser("scan", help="scan image files or directories")
+    scan.add_argument("paths", nargs="+", help="image files or directories")
+    scan.add_argument("--out", help="output file (.json or .csv); JSON to stdout if omitted")
+    scan.add_argument("--recursive", action="store_true", help="descend into subdirectories")
+    scan.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="scanner processes")
+    scan.add_argument("--conf", type=float, default=0.25, help="confidence threshold")
+    scan.add_argument("--nms", type=float, default=0.4, help="NMS threshold")
+    scan.add_argument("--tiled", action="store_true", help="tiled inference for small items")
+    scan.add_argument("--tile-size", type=int, default=416)
+    scan.add_argument("--tile-overlap", type=float, default=0.2)
+    scan.add_argument("--floor", choices=["off", "band", "edges"], default="off", help="floor-region gating")
+    scan.set_defaults(func=cmd_scan)
+
+    bundle = sub.add_parser("bundle", help="build an offline model bundle with SHA-256 manifest")
+    bundle.add_argument("--src", default=MODEL_DIR, help="directory holding the cfg, weights and names files")
+    bundle.add_argument("--out", default=BUNDLE_DIR, help="bundle directory to write")
+    bundle.add_argument("--version", type=int, default=1, help="bundle version recorded in the manifest")
+    bundle.set_defaults(func=cmd_bundle)
+
+    calibrate = sub.add_parser("calibrate", help="time every model profile on this machine and pick one for a latency budget")
+    calibrate.add_argument("--budget", type=float, default=LATENCY_BUDGET_MS, help="per-frame latency budget in ms")
+    calibrate.add_argument("--out", default=CALIBRATION_FILE, help="where to save the timings")
+    calibrate.add_argument("--cached", action="store_true", help="reuse saved timings from this host if present")
+    calibrate.set_defaults(func=cmd_calibrate)
+
+    video = sub.add_parser("video", help="hazard timeline of a recorded video file")
+    video.add_argument("video", help="video file")
+    video.add_argument("--out", help="timeline JSON; stdout if omitted")
+    video.add_argument("--keyframes", help="directory for one annotated thumbnail per hazard event")
+    video.add_argument("--sample-fps", type=float, default=SAMPLE_FPS, help="frames analysed per second of video")
+    video.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="analysis processes")
+    video.add_argument("--segments", type=int, help="segments to split the video into (default 2 per worker)")
+    video.add_argument("--conf", type=float, default=0.25, help="confidence threshold")
+    video.add_argument("--nms", type=float, default=0.4, help="NMS threshold")
+    video.add_argument("--tiled", action="store_true", help="tiled inference for small items")
+    video.add_argument("--tile-size", type=int, default=416)
+    video.add_argument("--tile-overlap", type=float, default=0.2)
+    video.add_argument("--floor", choices=["off", "band", "edges"], default="off", help="floor-region gating")
+    video.set_defaults(func=cmd_video)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
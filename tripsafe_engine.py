@@ -0,0 +1,532 @@
+# ==============================================================================
+# "TripSafe AI: Detection Engine"
+# Headless model loading, inference and reporting. No Streamlit imports, so the
+# same code runs in the web app, the CLI and batch jobs.
+# ==============================================================================
+
+import numpy as np
+import cv2
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import time
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from PIL import Image
+
+from tripsafe_metrics import metrics
+
+# ==============================================================================
+# 1. Model Management
+# ==============================================================================
+# Models load only from local files, never over the network. A bundle is a directory with
+# the cfg, weights and names files plus model_manifest.json recording their SHA-256 hashes;
+# build one with: python tripsafe_cli.py bundle --out models/yolov3-tiny-416
+# Loose files without a manifest are refused unless TRIPSAFE_ALLOW_UNVERIFIED=1 (development only).
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_ID = "yolov3-tiny-416"
+INPUT_SIZE = 416
+MODEL_FILES = {"cfg": "yolov3-tiny.cfg", "weights": "yolov3-tiny.weights", "names": "coco.names"}
+MANIFEST_NAME = "model_manifest.json"
+BUNDLE_DIR = os.environ.get("TRIPSAFE_MODEL_BUNDLE") or os.path.join(MODEL_DIR, "models", MODEL_ID)
+ALLOW_UNVERIFIED = os.environ.get("TRIPSAFE_ALLOW_UNVERIFIED", "") not in ("", "0")
+
+class ModelBundleError(Exception):
+    pass
+
+# CPU backends cv2.dnn can run on; a backend only counts as available when it offers a CPU target
+BACKENDS = {
+    "opencv": (cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU),
+    "openvino": (cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE, cv2.dnn.DNN_TARGET_CPU),
+}
+
+def available_backends():
+    return [name for name, (backend, target) in BACKENDS.items() if target in cv2.dnn.getAvailableTargets(backend)]
+
+# The built-in model at its native size; tripsafe_profiles picks others from a latency budget
+DEFAULT_PROFILE = {"name": MODEL_ID, "model": "yolov3-tiny", "dir": None, "input_size": INPUT_SIZE, "backend": "opencv"}
+
+def map_file(path):
+    # Read-only memory map of a model file (mmap refuses empty files)
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0: return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def build_model_bundle(out_dir, src_dir=MODEL_DIR, model_id=MODEL_ID, version=1):
+    os.makedirs(out_dir, exist_ok=True)
+    files = {}
+    for role, name in MODEL_FILES.items():
+        src, dst = os.path.join(src_dir, name), os.path.join(out_dir, name)
+        if not os.path.exists(src): raise ModelBundleError(f"missing model file {src}")
+        if os.path.abspath(src) != os.path.abspath(dst): shutil.copyfile(src, dst)
+        files[role] = {"name": name, "sha256": hashlib.sha256(map_file(dst)).hexdigest(), "bytes": os.path.getsize(dst)}
+    manifest = {"id": model_id, "version": version, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "files": files}
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w") as f: json.dump(manifest, f, indent=2)
+    return manifest
+
+def find_model_dir(model_dir=None):
+    # Explicit directory, else the bundle, else the loose files next to this module
+    if model_dir: return model_dir
+    return BUNDLE_DIR if os.path.exists(os.path.join(BUNDLE_DIR, MANIFEST_NAME)) else MODEL_DIR
+
+def load_yolo_model(model_dir=None, warmup=True, backend="opencv", input_size=INPUT_SIZE, allow_unverified=None):
+    # Returns (net, output_layers, classes, info). The Net is built from the same mapped bytes
+    # that were hashed, then run once so the first real scan does not pay for layer setup.
+    # Without a manifest (loose files) the load fails unless unverified files are allowed,
+    # in which case info["verified"] stays False and callers warn about it.
+    # A bundle without a cfg file is read as ONNX; it must emit Darknet-style YOLO rows.
+    t0 = time.perf_counter()
+    model_dir = find_model_dir(model_dir)
+    info = {"id": MODEL_ID, "version": None, "dir": model_dir, "verified": False}
+    try:
+        manifest_path = os.path.join(model_dir, MANIFEST_NAME)
+        manifest = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f: manifest = json.load(f)
+            info["id"], info["version"] = manifest.get("id", MODEL_ID), manifest.get("version")
+        elif not (ALLOW_UNVERIFIED if allow_unverified is None else allow_unverified):
+            raise ModelBundleError(f"no {MANIFEST_NAME} in {model_dir}; build a bundle with `python tripsafe_cli.py bundle` or set TRIPSAFE_ALLOW_UNVERIFIED=1 for development")
+        entries = manifest["files"] if manifest else {role: {"name": name} for role, name in MODEL_FILES.items()}
+        buffers = {}
+        for role, entry in entries.items():
+            path = os.path.join(model_dir, entry["name"])
+            if not os.path.exists(path):
+                if role == "names" and not manifest: continue
+                raise ModelBundleError(f"missing model file {path}")
+            buffers[role] = map_file(path)
+            if manifest and hashlib.sha256(buffers[role]).hexdigest() != entry["sha256"]:
+                raise ModelBundleError(f"checksum mismatch for {entry['name']}")
+        if "weights" not in buffers: raise ModelBundleError("bundle needs a weights file")
+        info["verified"] = manifest is not None
+        t1 = time.perf_counter()
+
+        weights = np.frombuffer(buffers["weights"], np.uint8)
+        net = cv2.dnn.readNetFromDarknet(np.frombuffer(buffers["cfg"], np.uint8), weights) if "cfg" in buffers else cv2.dnn.readNetFromONNX(weights)
+        net.setPreferableBackend(BACKENDS[backend][0])
+        net.setPreferableTarget(BACKENDS[backend][1])
+        output_layers = list(net.getUnconnectedOutLayersNames())
+        classes = [c.strip() for c in bytes(buffers["names"]).decode("utf-8").splitlines()] if "names" in buffers else []
+        t2 = time.perf_counter()
+
+        if warmup:
+            net.setInput(cv2.dnn.blobFromImage(np.zeros((input_size, input_size, 3), np.uint8), 0.00392, (input_size, input_size), (0, 0, 0), True, crop=False))
+            net.forward(output_layers)
+        t3 = time.perf_counter()
+    except (ModelBundleError, OSError, ValueError, KeyError, cv2.error) as e:
+        info["error"] = str(e)
+        return None, None, None, info
+    info.update(verify_ms=(t1 - t0) * 1000, load_ms=(t2 - t1) * 1000, warmup_ms=(t3 - t2) * 1000, startup_ms=(t3 - t0) * 1000)
+    metrics.observe("model_load", info["startup_ms"])
+    return net, output_layers, classes, info
+
+# ==============================================================================
+# 2. Ingest & Inference
+# ==============================================================================
+def decode_yolo_outputs(outs, w_img, h_img, conf_threshold):
+    # Vectorized decoding of all YOLO output rows at once (argmax, threshold, box conversion)
+    dets = np.concatenate([o.reshape(-1, o.shape[-1]) for o in outs], axis=0)
+    scores = dets[:, 5:]
+    class_ids = np.argmax(scores, axis=1)
+    confidences = scores[np.arange(len(scores)), class_ids]
+    keep = confidences > conf_threshold
+    dets, class_ids, confidences = dets[keep], class_ids[keep], confidences[keep]
+    
+    # astype(int) truncates toward zero exactly like int() did in the per-row loop
+    center_x, center_y = (dets[:, 0] * w_img).astype(np.int32), (dets[:, 1] * h_img).astype(np.int32)
+    w, h = (dets[:, 2] * w_img).astype(np.int32), (dets[:, 3] * h_img).astype(np.int32)
+    x, y = (center_x - w / 2).astype(np.int32), (center_y - h / 2).astype(np.int32)
+    boxes = np.stack([x, y, w, h], axis=1)
+    return boxes, confidences.astype(np.float32), class_ids
+
+INGEST_MIN_SIDE = 960
+INGEST_MIN_SIDE_TILED = 1248
+DISPLAY_MAX_WIDTH = 960
+REDUCED_DECODE_FLAGS = [(8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2)]
+
+@metrics.timed("decode")
+def decode_image_bytes(data, min_side=INGEST_MIN_SIDE):
+    # Decode straight to one BGR buffer; large photos use the decoder's own 1/2, 1/4, 1/8 scaling
+    try: src_w, src_h = Image.open(BytesIO(data)).size  # header only, no pixel decode
+    except Exception: return None, None
+    factor, flag = 1, cv2.IMREAD_COLOR
+    for f, reduced_flag in REDUCED_DECODE_FLAGS:
+        if max(src_w, src_h) / f >= min_side:
+            factor, flag = f, reduced_flag
+            break
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+    if img is None: return None, None
+    # The old PIL path held 4 full-size copies: decode, np.array, RGB2BGR, BGR2RGB
+    legacy_bytes = 4 * src_w * src_h * 3
+    stats = {"source": (src_w, src_h), "decoded": (img.shape[1], img.shape[0]), "factor": factor, "bytes_saved": legacy_bytes - img.nbytes}
+    return img, stats
+
+def make_blob(img, input_size=INPUT_SIZE):
+    return cv2.dnn.blobFromImage(img, 0.00392, (input_size, input_size), (0, 0, 0), True, crop=False)
+
+@metrics.timed("inference")
+def run_yolo_forward(img, net, output_layers, input_size=INPUT_SIZE):
+    # Forward pass only: raw (N, 85) rows, cached per image so threshold changes skip inference
+    blob = make_blob(img, input_size)
+    net.setInput(blob)
+    outs = net.forward(output_layers)
+    return np.concatenate([o.reshape(-1, o.shape[-1]) for o in outs], axis=0)
+
+def make_tiles(w_img, h_img, tile_size=416, overlap=0.2):
+    # Overlapping (x, y, w, h) windows covering the image, spread evenly from edge to edge
+    stride = max(1, int(tile_size * (1 - overlap)))
+    def starts(length):
+        if length <= tile_size: return [0]
+        n = int(np.ceil((length - tile_size) / stride)) + 1
+        return [int(round(v)) for v in np.linspace(0, length - tile_size, n)]
+    return [(x, y, min(tile_size, w_img - x), min(tile_size, h_img - y)) for y in starts(h_img) for x in starts(w_img)]
+
+@metrics.timed("inference_tiled")
+def run_tiled_forward(img, net, output_layers, tile_size=416, overlap=0.2, input_size=INPUT_SIZE):
+    # Full frame at the profile's input size, then all tiles in one batched call at their own
+    # size (a multiple of 32), so tiles are not upscaled to a larger profile size. Only edge
+    # tiles of an image narrower than tile_size are stretched. Rows are mapped back to
+    # full-image normalized coordinates, so decoding and the global NMS stay unchanged.
+    h_img, w_img = img.shape[:2]
+    full = run_yolo_forward(img, net, output_layers, input_size)
+    rects = make_tiles(w_img, h_img, tile_size, overlap)
+    tile_input = max(32, tile_size // 32 * 32)
+    blob = cv2.dnn.blobFromImages([img[y:y + h, x:x + w] for x, y, w, h in rects], 0.00392, (tile_input, tile_input), (0, 0, 0), True, crop=False)
+    net.setInput(blob)
+    outs = net.forward(output_layers)
+    rows = np.concatenate([o.reshape(len(rects), -1, o.shape[-1]) for o in outs], axis=1)
+    return np.concatenate([full, map_rows_to_image(rows, rects, w_img, h_img)])
+
+def map_rows_to_image(rows, rects, w_img, h_img):
+    # rows: (n, R, 85) normalized to each of the n crop rects -> (n*R, 85) normalized to the image
+    r = np.array(rects, np.float32)[:, None, :]
+    rows[:, :, 0] = (r[:, :, 0] + rows[:, :, 0] * r[:, :, 2]) / w_img
+    rows[:, :, 1] = (r[:, :, 1] + rows[:, :, 1] * r[:, :, 3]) / h_img
+    rows[:, :, 2] *= r[:, :, 2] / w_img
+    rows[:, :, 3] *= r[:, :, 3] / h_img
+    return rows.reshape(-1, rows.shape[-1])
+
+FLOOR_BAND = 0.5
+
+def estimate_floor_roi(img, mode="band", user_roi=None):
+    # Cheap floor estimate as an (x, y, w, h) rect: lower band, wall/floor edge, or a user-set rect
+    h_img, w_img = img.shape[:2]
+    if mode == "custom" and user_roi:
+        (x0, x1), (y0, y1) = user_roi
+        x, y = int(x0 * w_img), int(y0 * h_img)
+        return (x, y, max(1, int(x1 * w_img) - x), max(1, int(y1 * h_img) - y))
+    top = 1 - FLOOR_BAND
+    if mode == "edges":
+        # Strongest horizontal edge in the middle of the frame is usually the wall/floor line
+        small = cv2.resize(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), (160, max(16, round(160 * h_img / w_img))), interpolation=cv2.INTER_AREA)
+        rows = np.abs(cv2.Sobel(small, cv2.CV_32F, 0, 1, ksize=3)).mean(axis=1)
+        lo, hi = int(len(rows) * 0.25), int(len(rows) * 0.75)
+        top = (lo + int(np.argmax(rows[lo:hi]))) / len(rows)
+    y = int(top * h_img)
+    return (0, y, w_img, h_img - y)
+
+def run_scan_forward(img, net, output_layers, tiling=None, roi=None, input_size=INPUT_SIZE):
+    # Only the floor ROI (when set) goes through the network; rows come back in full-image coordinates
+    forward = lambda im: run_tiled_forward(im, net, output_layers, *tiling, input_size=input_size) if tiling else run_yolo_forward(im, net, output_layers, input_size)
+    if roi is None: return forward(img)
+    x, y, w, h = roi
+    rows = forward(img[y:y + h, x:x + w])
+    return map_rows_to_image(rows[None], [roi], img.shape[1], img.shape[0])
+
+def in_roi(box, roi):
+    # A detection counts as on the floor when the bottom-centre of its box lies inside the ROI
+    x, y, w, h = box
+    rx, ry, rw, rh = roi
+    return rx <= x + w / 2 <= rx + rw and ry <= y + h <= ry + rh
+
+# ==============================================================================
+# 3. Detection, Rendering & Reports
+# ==============================================================================
+HIGH_RISK_ITEMS = ['sports ball', 'bottle', 'cup', 'wine glass', 'bowl', 'knife', 'spoon', 'fork', 'scissors', 'mouse', 'remote', 'cell phone', 'keyboard', 'book', 'laptop', 'backpack', 'suitcase', 'handbag', 'umbrella', 'teddy bear']
+SAFE_ZONES = ['dining table', 'desk', 'sofa', 'bed', 'cabinet', 'refrigerator', 'shelf']
+
+def detect_hazards_and_zones(img, net, output_layers, classes, conf_threshold, nms_threshold, outs=None, roi=None, input_size=INPUT_SIZE):
+    # input_size only applies when the forward pass runs here (outs is None); adaptive
+    # resolution lives in HazardDetector.forward
+    h_img, w_img, _ = img.shape
+    if outs is None: outs = run_yolo_forward(img, net, output_layers, input_size)
+    detections, hazards, safe_zones_found = postprocess_detections(outs, w_img, h_img, classes, conf_threshold, nms_threshold, roi)
+    return detections, hazards, safe_zones_found, HIGH_RISK_ITEMS
+
+@metrics.timed("postprocess")
+def postprocess_detections(outs, w_img, h_img, classes, conf_threshold, nms_threshold, roi=None):
+    # Decode, NMS and labelling of raw rows into detections plus hazard / safe-zone labels
+    boxes, confidences, class_ids = decode_yolo_outputs([outs], w_img, h_img, conf_threshold)
+    indexes = cv2.dnn.NMSBoxes(boxes, confidences, conf_threshold, nms_threshold) if len(boxes) else []
+    detections, hazards, safe_zones_found = [], [], []
+    
+    if len(indexes) > 0:
+        for i in np.array(indexes).flatten():
+            if roi is not None and not in_roi(boxes[i], roi): continue
+            label = str(classes[class_ids[i]])
+            detections.append({"label": label, "confidence": float(confidences[i]), "box": [int(v) for v in boxes[i]]})
+            if label in HIGH_RISK_ITEMS: hazards.append(label)
+            elif label in SAFE_ZONES: safe_zones_found.append(label)
+    return detections, hazards, safe_zones_found
+
+def draw_detections(img, detections, scale=1.0):
+    # Line and font sizes grow with the image so labels read the same at any resolution
+    ui = max(1.0, img.shape[1] / DISPLAY_MAX_WIDTH)
+    font_scale, thickness = 0.6 * ui, max(1, round(ui))
+    for det in detections:
+        x, y, w, h = (int(round(v * scale)) for v in det["box"])
+        label = det["label"]
+        color = (0, 0, 255) if label in HIGH_RISK_ITEMS else ((0, 255, 0) if label in SAFE_ZONES else (0, 165, 255))
+        
+        # Draw Styled Box
+        cv2.rectangle(img, (x, y), (x+w, y+h), color, 2 * thickness)
+        
+        # Draw Styled Label Background
+        label_text = f"{label.title()}"
+        (tw, th), _ = cv2.getTextSize(label_text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+        pad = int(5 * ui)
+        cv2.rectangle(img, (x, y - th - 2 * pad), (x + tw + 2 * pad, y), color, -1)
+        cv2.putText(img, label_text, (x + pad, y - pad), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), thickness)
+    return img
+
+def encode_image(img, fmt=".jpg", quality=80):
+    flag = cv2.IMWRITE_WEBP_QUALITY if fmt == ".webp" else cv2.IMWRITE_JPEG_QUALITY
+    ok, buf = cv2.imencode(fmt, img, [flag, int(quality)])
+    return buf.tobytes() if ok else None
+
+@metrics.timed("render")
+def render_display_image(img, detections, max_width=DISPLAY_MAX_WIDTH, fmt=".jpg", quality=80, roi=None):
+    # Annotate a display-sized copy only; the browser never receives the full frame
+    h_img, w_img = img.shape[:2]
+    scale = min(1.0, max_width / w_img)
+    if scale < 1.0: out = cv2.resize(img, (round(w_img * scale), round(h_img * scale)), interpolation=cv2.INTER_AREA)
+    else: out = img.copy()
+    if roi is not None:
+        x, y, w, h = (int(v * scale) for v in roi)
+        cv2.rectangle(out, (x, y), (x + w - 1, y + h - 1), (248, 189, 56), 1)
+    return encode_image(draw_detections(out, detections, scale), fmt, quality)
+
+@metrics.timed("render_full")
+def render_full_resolution(data, detections, decoded_size, fmt=".jpg", quality=92):
+    # On-demand export: decode the original at full size and scale the boxes up to it
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if img is None: return None
+    return encode_image(draw_detections(img, detections, img.shape[1] / decoded_size[0]), fmt, quality)
+
+def get_placement_suggestions(hazards, safe_zones, lang_code="English"):
+    suggestions = []
+    furniture = list(set(safe_zones))
+    is_hindi = lang_code == "Hindi"
+    
+    for item in set(hazards):
+        sug = "Clear from floor." if not is_hindi else "फर्श से हटाएं।"
+        if item == 'bottle':
+            sug = "If water bottle: **Kitchen/Table**. If medicine: **Cabinet**." if not is_hindi else "यदि पानी की बोतल है: **किचन/टेबल**। यदि दवा है: **अलमारी**।"
+        elif item in ['cup', 'bowl']:
+            sug = "Move to **Kitchen** or **Dining Table**." if not is_hindi else "**किचन** या **डाइनिंग टेबल** पर रखें।"
+        elif item in ['book', 'laptop', 'mouse']:
+            if 'desk' in furniture: sug = "Place on **Desk**." if not is_hindi else "**डेस्क** पर रखें।"
+            else: sug = "Store on shelf." if not is_hindi else "शेल्फ पर रखें।"
+        elif item in ['backpack', 'handbag']:
+            if 'sofa' in furniture: sug = "Place on **Sofa**." if not is_hindi else "**सोफा** पर रखें।"
+            else: sug = "Hang in closet." if not is_hindi else "अलमारी में रखें।"
+        suggestions.append(f"🔸 **{item.title()}**: {sug}")
+    return suggestions
+
+def generate_report(items, suggestions, risk):
+    txt = f"TRIPSAFE AI REPORT\nDate: {time.strftime('%c')}\nStatus: {risk}\n\nITEMS FOUND:\n" + "\n".join([f"- {i}" for i in set(items)])
+    txt += "\n\nRECOMMENDED ACTIONS:\n" + "\n".join([s.replace('**','') for s in suggestions])
+    return txt
+
+def risk_level(hazards, risk_list=HIGH_RISK_ITEMS):
+    # Language-neutral status key ("high_risk" / "caution" / "safe") plus the high-risk count
+    risk_count = sum(1 for i in hazards if i in risk_list)
+    if risk_count > 0: return "high_risk", risk_count
+    elif hazards: return "caution", 0
+    return "safe", 0
+
+# ==============================================================================
+# 4. Batch Scanning
+# ==============================================================================
+BATCH_SIZE = 8
+BATCH_WORKERS = min(8, os.cpu_count() or 1)
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png')
+
+def expand_uploads(files):
+    # (name, bytes) for every uploaded image, unpacking zip archives of room photos
+    for f in files:
+        data = f.getvalue()
+        if f.name.lower().endswith('.zip'):
+            with zipfile.ZipFile(BytesIO(data)) as zf:
+                for info in zf.infolist():
+                    if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTS):
+                        yield info.filename, zf.read(info)
+        else:
+            yield f.name, data
+
+@metrics.timed("inference_batch")
+def run_batch_forward(imgs, net, output_layers, input_size=INPUT_SIZE):
+    # N images -> one (N, 3, S, S) blob -> one forward call -> N row arrays
+    blob = cv2.dnn.blobFromImages(imgs, 0.00392, (input_size, input_size), (0, 0, 0), True, crop=False)
+    net.setInput(blob)
+    outs = net.forward(output_layers)
+    return list(np.concatenate([o.reshape(len(imgs), -1, o.shape[-1]) for o in outs], axis=1))
+
+def scan_batch(items, net, output_layers, classes, conf_threshold, nms_threshold, floor_mode="off", user_roi=None, batch_size=BATCH_SIZE, workers=BATCH_WORKERS, batch_forward=None, input_size=INPUT_SIZE):
+    # Generator yielding one result per image as soon as its chunk is done. Decoding and
+    # annotation run on a thread pool (OpenCV releases the GIL); the next chunk decodes
+    # while the current one is in the network, which stays on the calling thread unless
+    # batch_forward (e.g. a shared InferenceService) is given.
+    if batch_forward is None: batch_forward = lambda imgs: run_batch_forward(imgs, net, output_layers, input_size)
+    def decode(item):
+        name, data = item
+        img, _ = decode_image_bytes(data)
+        roi = estimate_floor_roi(img, floor_mode, user_roi) if img is not None and floor_mode != "off" else None
+        return name, img, roi
+    
+    def annotate(name, img, roi, rows):
+        if roi is not None: rows = map_rows_to_image(rows[None], [roi], img.shape[1], img.shape[0])
+        detections, hazards, zones, risk_list = detect_hazards_and_zones(img, net, output_layers, classes, conf_threshold, nms_threshold, outs=rows, roi=roi)
+        preview = render_display_image(img, detections, max_width=480, roi=roi)
+        return {"name": name, "detections": detections, "hazards": hazards, "zones": zones, "risk_list": risk_list, "preview": preview}
+    
+    chunks = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    with ThreadPoolExecutor(workers) as pool:
+        pending = [pool.submit(decode, it) for it in chunks[0]] if chunks else []
+        for c in range(len(chunks)):
+            decoded = [f.result() for f in pending]
+            pending = [pool.submit(decode, it) for it in chunks[c + 1]] if c + 1 < len(chunks) else []
+            for name, img, _ in decoded:
+                if img is None: yield {"name": name, "error": True}
+            ok = [d for d in decoded if d[1] is not None]
+            if not ok: continue
+            crops = [img if roi is None else img[roi[1]:roi[1] + roi[3], roi[0]:roi[0] + roi[2]] for _, img, roi in ok]
+            rows = batch_forward(crops)
+            for fut in [pool.submit(annotate, name, img, roi, r) for (name, img, roi), r in zip(ok, rows)]:
+                yield fut.result()
+
+def time_single_scan(data, net, output_layers, classes, conf_threshold, nms_threshold, forward=None, input_size=INPUT_SIZE):
+    # Reference timing of the one-image-at-a-time path, for the batch throughput comparison
+    t0 = time.perf_counter()
+    img, _ = decode_image_bytes(data)
+    if img is None: return None
+    outs = forward(img) if forward else None
+    detections = detect_hazards_and_zones(img, net, output_layers, classes, conf_threshold, nms_threshold, outs=outs, input_size=input_size)[0]
+    render_display_image(img, detections, max_width=480)
+    return time.perf_counter() - t0
+
+# ==============================================================================
+# 5. Result Cache
+# ==============================================================================
+class ScanResultCache:
+    # Process-wide LRU of finished scans, bounded by the bytes of the stored images
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes, self.size_bytes = max_bytes, 0
+        self.hits = self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                metrics.count("scan_cache_miss")
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            metrics.count("scan_cache_hit")
+            return item[0]
+
+    def put(self, key, value, nbytes):
+        if nbytes > self.max_bytes: return
+        with self._lock:
+            if key in self._items: self.size_bytes -= self._items.pop(key)[1]
+            self._items[key] = (value, nbytes)
+            self.size_bytes += nbytes
+            while self.size_bytes > self.max_bytes:
+                _, (_, old_bytes) = self._items.popitem(last=False)
+                self.size_bytes -= old_bytes
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._items), "bytes": self.size_bytes}
+
+# ==============================================================================
+# 6. HazardDetector
+# ==============================================================================
+class HazardDetector:
+    # A loaded model plus scan settings, for use outside the web UI (CLI, batch jobs, services)
+    # With a shared InferenceService, forward passes go through its Net pool instead of self.net.
+    # An optional ResolutionController (own Net only) adapts the input size to a latency target.
+    def __init__(self, conf_threshold=0.25, nms_threshold=0.4, tiling=None, floor_mode="off", user_roi=None, model_dir=None, service=None, profile=None):
+        self.profile = profile or (service.profile if service else DEFAULT_PROFILE)
+        self.input_size = self.profile["input_size"]
+        if service:
+            # Forward passes all go through the service's Nets, so no private copy is loaded
+            self.net, self.output_layers, self.classes, self.model_info = None, None, service.classes, service.model_info
+        else:
+            self.net, self.output_layers, self.classes, self.model_info = load_yolo_model(model_dir or self.profile["dir"], backend=self.profile["backend"], input_size=self.input_size)
+        self.conf_threshold, self.nms_threshold = conf_threshold, nms_threshold
+        self.tiling, self.floor_mode, self.user_roi = tiling, floor_mode, user_roi
+        self.service, self.controller = service, None
+
+    @property
+    def ready(self):
+        return self.service.ready if self.service else self.net is not None
+
+    def floor_roi(self, img):
+        return estimate_floor_roi(img, self.floor_mode, self.user_roi) if self.floor_mode != "off" else None
+
+    def forward(self, img, roi=None):
+        if self.service: return self.service.forward(img, self.tiling, roi)
+        if self.controller is None: return run_scan_forward(img, self.net, self.output_layers, self.tiling, roi, self.input_size)
+        t0 = time.perf_counter()
+        outs = run_scan_forward(img, self.net, self.output_layers, self.tiling, roi, self.controller.size)
+        self.controller.observe((time.perf_counter() - t0) * 1000)
+        return outs
+
+    def detect(self, img, outs=None):
+        roi = self.floor_roi(img)
+        if outs is None: outs = self.forward(img, roi)
+        detections, hazards, zones, risk_list = detect_hazards_and_zones(img, self.net, self.output_layers, self.classes, self.conf_threshold, self.nms_threshold, outs=outs, roi=roi)
+        risk, risk_count = risk_level(hazards, risk_list)
+        return {"detections": detections, "hazards": hazards, "zones": zones, "risk": risk, "risk_count": risk_count, "roi": roi}
+
+    def scan_bytes(self, data, lang_code="English"):
+        t0 = time.perf_counter()
+        img, ingest = decode_image_bytes(data, INGEST_MIN_SIDE_TILED if self.tiling else INGEST_MIN_SIDE)
+        if img is None: return None
+        result = self.detect(img)
+        result["suggestions"] = get_placement_suggestions(result["hazards"], result["zones"], lang_code)
+        result["ingest"] = ingest
+        result["ms"] = (time.perf_counter() - t0) * 1000
+        return result
+
+    def scan_file(self, path, lang_code="English"):
+        with open(path, "rb") as f: return self.scan_bytes(f.read(), lang_code)
+
+    def scan_batch(self, items):
+        batch_forward = self.service.forward_batch if self.service else None
+        return scan_batch(items, self.net, self.output_layers, self.classes, self.conf_threshold, self.nms_threshold, self.floor_mode, self.user_roi, batch_forward=batch_forward, input_size=self.input_size)
+
+# --- Process-pool workers (CLI scans, video segments, evaluation) ---
+_pool_detector = None
+
+def detector_settings(conf_threshold=0.25, nms_threshold=0.4, tiling=None, floor_mode="off", user_roi=None, profile=None):
+    # Picklable HazardDetector keyword arguments, handed to init_pool_worker in every process
+    return {"conf_threshold": conf_threshold, "nms_threshold": nms_threshold, "tiling": tiling, "floor_mode": floor_mode, "user_roi": user_roi, "profile": profile}
+
+def init_pool_worker(settings=None):
+    # Process-pool initializer. Parallelism comes from the pool, so OpenCV gets one thread per
+    # process; with settings the process also builds its own HazardDetector (and Net).
+    global _pool_detector
+    cv2.setNumThreads(1)
+    if settings is not None: _pool_detector = HazardDetector(**settings)
+
+def pool_detector():
+    return _pool_detector
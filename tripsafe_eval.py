@@ -0,0 +1,250 @@
+# ==============================================================================
+# "TripSafe AI: Accuracy vs Latency Evaluation"
+# Runs the detector over a labelled image folder for a grid of settings and
+# reports precision / recall / mAP@0.5 on the HIGH_RISK_ITEMS and SAFE_ZONES
+# classes next to per-image latency, marking the Pareto-optimal settings, e.g.:
+#   python tripsafe_eval.py data/val --out eval.csv
+#   python tripsafe_eval.py data/val --coco data/val/instances.json --sizes 320,416 --tiling off
+# Labels: YOLO .txt files (labels/ next to images/, or beside each image; class
+# ids index --names, default coco.names) or a COCO instances JSON.
+# ==============================================================================
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tripsafe_cli import find_images
+from tripsafe_engine import (
+    HIGH_RISK_ITEMS, INGEST_MIN_SIDE, INGEST_MIN_SIDE_TILED, MANIFEST_NAME, MODEL_DIR, MODEL_FILES, SAFE_ZONES,
+    decode_image_bytes, init_pool_worker, load_yolo_model, postprocess_detections, run_scan_forward,
+)
+from tripsafe_profiles import MODELS
+
+EVAL_CLASSES = HIGH_RISK_ITEMS + SAFE_ZONES
+IOU_THRESHOLD = 0.5
+CONF_GRID = (0.1, 0.25, 0.4, 0.55)
+NMS_GRID = (0.3, 0.4, 0.5)
+SIZE_GRID = (320, 416, 608)
+TILING_GRID = (None, (416, 0.2))
+
+# --- Ground truth ---
+def read_names(path):
+    with open(path, encoding="utf-8") as f: return [line.strip() for line in f if line.strip()]
+
+def yolo_label_path(image_path):
+    # Ultralytics layout (.../images/x.jpg -> .../labels/x.txt), else a .txt beside the image
+    stem = os.path.splitext(image_path)[0]
+    parts = stem.split(os.sep)
+    if "images" in parts:
+        i = len(parts) - 1 - parts[::-1].index("images")
+        candidate = os.sep.join(parts[:i] + ["labels"] + parts[i + 1:]) + ".txt"
+        if os.path.exists(candidate): return candidate
+    return stem + ".txt"
+
+def load_yolo_labels(images, names):
+    # {image_path: [(label, cx, cy, w, h)]} in normalized coordinates, eval classes only
+    truth = {}
+    for path in images:
+        boxes, label_path = [], yolo_label_path(path)
+        if os.path.exists(label_path):
+            with open(label_path) as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) < 5: continue
+                    label = names[int(parts[0])] if int(parts[0]) < len(names) else None
+                    if label in EVAL_CLASSES: boxes.append((label, *map(float, parts[1:5])))
+        truth[path] = boxes
+    return truth
+
+def load_coco_labels(root, ann_path):
+    with open(ann_path) as f: coco = json.load(f)
+    categories = {c["id"]: c["name"] for c in coco["categories"]}
+    images = {im["id"]: im for im in coco["images"]}
+    truth = {os.path.join(root, im["file_name"]): [] for im in images.values()}
+    for ann in coco["annotations"]:
+        im, label = images[ann["image_id"]], categories[ann["category_id"]]
+        if label not in EVAL_CLASSES or ann.get("iscrowd"): continue
+        x, y, w, h = ann["bbox"]
+        truth[os.path.join(root, im["file_name"])].append((label, (x + w / 2) / im["width"], (y + h / 2) / im["height"], w / im["width"], h / im["height"]))
+    return {path: boxes for path, boxes in truth.items() if os.path.exists(path)}
+
+# --- Per-process detector runs ---
+_nets = {}
+
+def _net(model):
+    if model not in _nets: _nets[model] = load_yolo_model(MODELS[model]["dir"], warmup=False)
+    return _nets[model]
+
+def _eval_image(args):
+    # One image through every forward setting (model, size, tiling), each forward result
+    # post-processed for every (conf, nms) pair. Boxes come back normalized to the image.
+    path, forwards, post_grid = args
+    with open(path, "rb") as f: data = f.read()
+    out = {"file": path, "runs": {}}
+    decoded = {}  # tiling -> (img, decode ms); tiled scans decode at the app's larger ingest size
+    for model, size, tiling in forwards:
+        if tiling not in decoded:
+            t0 = time.perf_counter()
+            decoded[tiling] = decode_image_bytes(data, INGEST_MIN_SIDE_TILED if tiling else INGEST_MIN_SIDE)[0], (time.perf_counter() - t0) * 1000
+        img, decode_ms = decoded[tiling]
+        if img is None: return {"file": path, "error": "could not decode image"}
+        net, output_layers, classes, info = _net(model)
+        if net is None: return {"file": path, "error": info["error"]}
+        t1 = time.perf_counter()
+        rows = run_scan_forward(img, net, output_layers, tiling, None, size)
+        forward_ms = (time.perf_counter() - t1) * 1000
+        h, w = img.shape[:2]
+        for conf, nms in post_grid:
+            t2 = time.perf_counter()
+            detections = postprocess_detections(rows, w, h, classes, conf, nms)[0]
+            post_ms = (time.perf_counter() - t2) * 1000
+            dets = [(d["label"], d["confidence"], (d["box"][0] + d["box"][2] / 2) / w, (d["box"][1] + d["box"][3] / 2) / h, d["box"][2] / w, d["box"][3] / h)
+                    for d in detections if d["label"] in EVAL_CLASSES]
+            out["runs"][(model, size, tiling, conf, nms)] = {"dets": dets, "ms": decode_ms + forward_ms + post_ms}
+    return out
+
+# --- Scoring ---
+def iou_matrix(a, b):
+    # a: (n, 4), b: (m, 4) as (cx, cy, w, h) -> (n, m) IoU
+    a0, a1 = a[:, None, :2] - a[:, None, 2:] / 2, a[:, None, :2] + a[:, None, 2:] / 2
+    b0, b1 = b[None, :, :2] - b[None, :, 2:] / 2, b[None, :, :2] + b[None, :, 2:] / 2
+    inter = np.prod(np.clip(np.minimum(a1, b1) - np.maximum(a0, b0), 0, None), axis=2)
+    union = np.prod(a[:, None, 2:], axis=2) + np.prod(b[None, :, 2:], axis=2) - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-12), 0.0)
+
+def match_image(dets, truth, iou_threshold=IOU_THRESHOLD):
+    # Greedy by confidence within each class, each ground-truth box matched at most once
+    # -> [(label, conf, is_tp)]
+    scored = []
+    for label in {d[0] for d in dets}:
+        preds = sorted((d for d in dets if d[0] == label), key=lambda d: -d[1])
+        gt = np.array([t[1:] for t in truth if t[0] == label], np.float64).reshape(-1, 4)
+        overlaps = iou_matrix(np.array([p[2:] for p in preds], np.float64), gt)
+        for i, p in enumerate(preds):
+            j = int(np.argmax(overlaps[i])) if len(gt) else -1
+            hit = bool(j >= 0 and overlaps[i, j] >= iou_threshold)
+            if hit: overlaps[:, j] = -1.0  # each ground-truth box is used once
+            scored.append((label, p[1], hit))
+    return scored
+
+def average_precision(scored, n_truth):
+    # All-point interpolated area under the precision/recall curve (VOC 2010+ / COCO style)
+    if n_truth == 0: return None
+    if not scored: return 0.0
+    tp = np.array([s[1] for s in sorted(scored, key=lambda s: -s[0])], np.float64)
+    tp_cum, fp_cum = np.cumsum(tp), np.cumsum(1 - tp)
+    recall = np.concatenate([[0.0], tp_cum / n_truth, [1.0]])
+    precision = np.concatenate([[1.0], tp_cum / (tp_cum + fp_cum), [0.0]])
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    steps = np.nonzero(recall[1:] != recall[:-1])[0]
+    return float(np.sum((recall[steps + 1] - recall[steps]) * precision[steps + 1]))
+
+def score_setting(results, truth, key):
+    per_class, n_truth, latencies = {}, {}, []
+    for r in results:
+        run = r["runs"][key]
+        latencies.append(run["ms"])
+        gt = truth[r["file"]]
+        for label, *_ in gt: n_truth[label] = n_truth.get(label, 0) + 1
+        for label, conf, is_tp in match_image(run["dets"], gt): per_class.setdefault(label, []).append((conf, is_tp))
+    aps = {label: average_precision(per_class.get(label, []), n) for label, n in n_truth.items()}
+    tp = sum(is_tp for s in per_class.values() for _, is_tp in s)
+    n_pred, n_gt = sum(len(s) for s in per_class.values()), sum(n_truth.values())
+    model, size, tiling, conf, nms = key
+    return {
+        "model": model, "input_size": size, "tiling": f"{tiling[0]}/{tiling[1]:g}" if tiling else "off", "conf": conf, "nms": nms,
+        "precision": tp / n_pred if n_pred else 0.0, "recall": tp / n_gt if n_gt else 0.0,
+        "map50": float(np.mean(list(aps.values()))) if aps else 0.0,
+        "latency_p50_ms": float(np.median(latencies)), "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "ap": {label: round(ap, 4) for label, ap in sorted(aps.items())},
+    }
+
+def mark_pareto(rows, quality="map50", cost="latency_p50_ms"):
+    # A setting is on the front when no other one is at least as accurate and at least as fast
+    # while strictly better on one of the two
+    for r in rows:
+        r["pareto"] = not any(o[quality] >= r[quality] and o[cost] <= r[cost] and (o[quality] > r[quality] or o[cost] < r[cost]) for o in rows)
+    return rows
+
+def evaluate(truth, models, sizes=SIZE_GRID, tilings=TILING_GRID, confs=CONF_GRID, nms_values=NMS_GRID, workers=None, progress=None):
+    forwards = [(m, s, t) for m in models for s in sizes for t in tilings]
+    post_grid = [(c, n) for c in confs for n in nms_values]
+    results, errors = [], []
+    with ProcessPoolExecutor(workers, initializer=init_pool_worker) as pool:
+        for r in pool.map(_eval_image, [(path, forwards, post_grid) for path in truth], chunksize=4):
+            (errors if "error" in r else results).append(r)
+            if progress: progress(len(results) + len(errors), len(truth))
+    rows = [score_setting(results, truth, (m, s, t, c, n)) for m, s, t in forwards for c, n in post_grid] if results else []
+    return mark_pareto(rows), errors
+
+def installed_models():
+    return [name for name, spec in MODELS.items() if spec["dir"] is None or os.path.exists(os.path.join(spec["dir"], MANIFEST_NAME))]
+
+def print_table(rows):
+    print(f"{'':2}{'model':<14}{'size':>6}{'tiling':>9}{'conf':>6}{'nms':>6}{'P':>8}{'R':>8}{'mAP50':>8}{'p50 ms':>9}{'p95 ms':>9}")
+    for r in sorted(rows, key=lambda r: r["latency_p50_ms"]):
+        print(f"{'*' if r['pareto'] else ' ':2}{r['model']:<14}{r['input_size']:>6}{r['tiling']:>9}{r['conf']:>6.2f}{r['nms']:>6.2f}"
+              f"{r['precision']:>8.3f}{r['recall']:>8.3f}{r['map50']:>8.3f}{r['latency_p50_ms']:>9.1f}{r['latency_p95_ms']:>9.1f}")
+
+def floats(text):
+    return tuple(float(v) for v in text.split(","))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="tripsafe_eval", description="Accuracy vs latency of TripSafe detector settings on a labelled dataset")
+    parser.add_argument("images", help="image directory (searched recursively)")
+    parser.add_argument("--coco", help="COCO instances JSON; YOLO .txt labels are used if omitted")
+    parser.add_argument("--names", default=os.path.join(MODEL_DIR, MODEL_FILES["names"]), help="class names for YOLO label ids")
+    parser.add_argument("--models", default=",".join(installed_models()), help="comma-separated model profiles to compare")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZE_GRID)), help="network input sizes")
+    parser.add_argument("--conf", default=",".join(map(str, CONF_GRID)), help="confidence thresholds")
+    parser.add_argument("--nms", default=",".join(map(str, NMS_GRID)), help="NMS thresholds")
+    parser.add_argument("--tiling", choices=["off", "on", "both"], default="both")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="evaluation processes (one model copy each)")
+    parser.add_argument("--limit", type=int, help="evaluate only the first N images")
+    parser.add_argument("--out", help="write the table as .csv or .json")
+    args = parser.parse_args(argv)
+
+    if args.coco: truth = load_coco_labels(args.images, args.coco)
+    else: truth = load_yolo_labels(list(find_images([args.images], recursive=True)), read_names(args.names))
+    if args.limit: truth = dict(list(truth.items())[:args.limit])
+    if not truth:
+        print("No labelled images found.", file=sys.stderr)
+        return 1
+    models = [m for m in args.models.split(",") if m]
+    unknown = [m for m in models if m not in MODELS]
+    if unknown:
+        print(f"Unknown model(s): {', '.join(unknown)}; choose from {', '.join(MODELS)}", file=sys.stderr)
+        return 1
+    tilings = {"off": (None,), "on": TILING_GRID[1:], "both": TILING_GRID}[args.tiling]
+    sizes = tuple(int(s) for s in args.sizes.split(","))
+    n_truth = sum(len(b) for b in truth.values())
+    print(f"{len(truth)} images, {n_truth} labelled objects in the evaluated classes", file=sys.stderr)
+    if not n_truth: print("Warning: no labels for HIGH_RISK_ITEMS or SAFE_ZONES classes; check --names or the label layout", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    report = lambda done, total: print(f"\r{done}/{total} images", end="", file=sys.stderr)
+    rows, errors = evaluate(truth, models, sizes, tilings, floats(args.conf), floats(args.nms), args.workers, report)
+    elapsed = time.perf_counter() - t0
+    print(f"\nEvaluated {len(rows)} settings on {len(truth) - len(errors)} images in {elapsed:.1f}s ({len(truth) / elapsed:.1f} images/s)", file=sys.stderr)
+    for e in errors[:10]: print(f"  skipped {e['file']}: {e['error']}", file=sys.stderr)
+    if not rows: return 1
+    print_table(rows)
+
+    if args.out and args.out.lower().endswith(".csv"):
+        with open(args.out, "w", newline="") as f:
+            writer = csv.writer(f)
+            fields = ["model", "input_size", "tiling", "conf", "nms", "precision", "recall", "map50", "latency_p50_ms", "latency_p95_ms", "pareto"]
+            writer.writerow(fields + ["ap"])
+            for r in rows: writer.writerow([r[k] for k in fields] + ["; ".join(f"{k}={v}" for k, v in r["ap"].items())])
+    elif args.out:
+        with open(args.out, "w") as f: json.dump({"images": len(truth), "objects": n_truth, "iou": IOU_THRESHOLD, "settings": rows}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
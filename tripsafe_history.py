@@ -0,0 +1,174 @@
+# ==============================================================================
+# "TripSafe AI: Scan History"
+# Every finished scan is kept in a local SQLite database (one row per scan, one
+# per detection), so trends such as "which rooms keep having cables on the
+# floor" are a query rather than a re-scan. Writes are queued and committed in
+# batches by a background thread; reads page with a (ts, id) cursor and never
+# load the whole table.
+# ==============================================================================
+
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from tripsafe_engine import HIGH_RISK_ITEMS, MODEL_DIR, SAFE_ZONES
+
+HISTORY_DB = os.environ.get("TRIPSAFE_HISTORY_DB") or os.path.join(MODEL_DIR, "history", "tripsafe_history.db")
+FLUSH_ROWS = 64  # scans per write transaction
+FLUSH_SECONDS = 2.0  # longest a queued scan waits before it is written
+PAGE_SIZE = 25
+
+log = logging.getLogger("tripsafe.history")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    image_hash TEXT NOT NULL,
+    room TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL,
+    hazard_count INTEGER NOT NULL,
+    zone_count INTEGER NOT NULL,
+    model TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS detections (
+    scan_id INTEGER NOT NULL REFERENCES scans(id) ON DELETE CASCADE,
+    label TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    x INTEGER NOT NULL, y INTEGER NOT NULL, w INTEGER NOT NULL, h INTEGER NOT NULL,
+    hazard INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scans_ts ON scans(ts);
+CREATE INDEX IF NOT EXISTS scans_room_ts ON scans(room, ts);
+CREATE INDEX IF NOT EXISTS scans_image ON scans(image_hash);
+CREATE INDEX IF NOT EXISTS detections_label ON detections(label, scan_id);
+CREATE INDEX IF NOT EXISTS detections_scan ON detections(scan_id);
+"""
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")  # readers are not blocked while a batch commits
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_DB, flush_rows=FLUSH_ROWS, flush_seconds=FLUSH_SECONDS):
+        self.path, self.flush_rows, self.flush_seconds = path, flush_rows, flush_seconds
+        if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._write = connect(path)
+        self._write.executescript(SCHEMA)
+        self._read = connect(path)
+        self._read_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self.written = self.batches = self.lost = 0
+        self._thread = threading.Thread(target=self._writer, name="history-writer", daemon=True)
+        self._thread.start()
+
+    # --- Writing ---
+    def record(self, image_hash, detections, status, room="", source="", model="", ts=None):
+        # Queued; the scan is committed with the next batch. status is the risk_level key.
+        hazards = sum(1 for d in detections if d["label"] in HIGH_RISK_ITEMS)
+        zones = sum(1 for d in detections if d["label"] in SAFE_ZONES)
+        self._queue.put(((ts or time.time(), image_hash, room.strip(), source, status, hazards, zones, model), detections))
+
+    def flush(self, timeout=10.0):
+        # Blocks until everything queued so far is on disk
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join(5)
+        self._write.close()
+        with self._read_lock: self._read.close()
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            if item is None: return
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_seconds
+            while True:
+                if isinstance(item, threading.Event): waiters.append(item)
+                elif item is None:
+                    self._commit(batch)
+                    for w in waiters: w.set()
+                    return
+                else: batch.append(item)
+                if waiters or len(batch) >= self.flush_rows: break
+                try: item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty: break
+            self._commit(batch)
+            for w in waiters: w.set()
+
+    def _commit(self, batch):
+        if not batch: return
+        try:
+            with self._write:
+                for scan, detections in batch:
+                    scan_id = self._write.execute("INSERT INTO scans (ts, image_hash, room, source, status, hazard_count, zone_count, model) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", scan).lastrowid
+                    self._write.executemany("INSERT INTO detections (scan_id, label, confidence, x, y, w, h, hazard) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                            [(scan_id, d["label"], d["confidence"], *d["box"], int(d["label"] in HIGH_RISK_ITEMS)) for d in detections])
+            self.written += len(batch)
+            self.batches += 1
+        except sqlite3.Error as e:
+            # History is best-effort: a locked or read-only database never fails a scan, but the
+            # dropped rows are logged and counted
+            self.lost += len(batch)
+            log.error("history write failed, %d scans lost: %s", len(batch), e)
+
+    # --- Reading ---
+    def _query(self, sql, args=()):
+        with self._read_lock: return [dict(r) for r in self._read.execute(sql, args).fetchall()]
+
+    def _filters(self, room=None, label=None, since=None, until=None):
+        clauses = [
+            ("s.room = ?", room or None),
+            ("s.ts >= ?", since),
+            ("s.ts < ?", until),
+            ("s.id IN (SELECT scan_id FROM detections WHERE label = ?)", label or None),  # driven by detections_label
+        ]
+        return [c for c, v in clauses if v is not None], [v for _, v in clauses if v is not None]
+
+    def page(self, cursor=None, limit=PAGE_SIZE, **filters):
+        # Newest first. cursor is the (ts, id) of the last row of the previous page; returns
+        # (rows, next_cursor) with next_cursor None on the last page
+        where, args = self._filters(**filters)
+        if cursor:
+            where.append("(s.ts < ? OR (s.ts = ? AND s.id < ?))")
+            args += [cursor[0], cursor[0], cursor[1]]
+        sql = "SELECT s.*, (SELECT group_concat(label, ', ') FROM (SELECT DISTINCT label FROM detections WHERE scan_id = s.id AND hazard = 1)) AS hazards FROM scans s"
+        if where: sql += " WHERE " + " AND ".join(where)
+        rows = self._query(sql + " ORDER BY s.ts DESC, s.id DESC LIMIT ?", args + [limit + 1])
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return rows, ((rows[-1]["ts"], rows[-1]["id"]) if more else None)
+
+    def count(self, **filters):
+        where, args = self._filters(**filters)
+        return self._query("SELECT count(*) AS n FROM scans s" + (" WHERE " + " AND ".join(where) if where else ""), args)[0]["n"]
+
+    def detections(self, scan_id):
+        return self._query("SELECT label, confidence, x, y, w, h, hazard FROM detections WHERE scan_id = ? ORDER BY confidence DESC", (scan_id,))
+
+    def rooms_with(self, label, since=None, until=None):
+        # Per room: scans in which label was detected and the last time it was seen
+        where, args = self._filters(label=label, since=since, until=until)
+        return self._query("SELECT s.room, count(*) AS scans, max(s.ts) AS last_seen FROM scans s WHERE " + " AND ".join(where) + " GROUP BY s.room ORDER BY scans DESC", args)
+
+    def rooms(self):
+        return [r["room"] for r in self._query("SELECT DISTINCT room FROM scans ORDER BY room")]
+
+    def labels(self):
+        return [r["label"] for r in self._query("SELECT DISTINCT label FROM detections ORDER BY label")]
+
+    def stats(self):
+        return {"written": self.written, "batches": self.batches, "lost": self.lost, "queued": self._queue.qsize()}
@@ -0,0 +1,155 @@
+# ==============================================================================
+# "TripSafe AI: Live Stream Pipeline"
+# Continuous scanning from a local webcam or a video file. Capture, inference
+# and rendering run on their own threads, joined by single-slot queues that
+# always hold the newest frame, so a slow stage drops frames instead of lagging.
+# A pipeline stops itself once nobody has polled latest() for IDLE_TIMEOUT
+# seconds (e.g. the browser tab was closed), and a new pipeline on a source
+# stops the one that held it before.
+# ==============================================================================
+
+import cv2
+import queue
+import threading
+import time
+from collections import deque
+
+from tripsafe_engine import DISPLAY_MAX_WIDTH, render_display_image
+from tripsafe_profiles import ResolutionController
+from tripsafe_tracking import ChangeGate, GatedDetector, HazardTracker
+
+IDLE_TIMEOUT = 30.0
+
+# source -> running pipeline; a camera can only be opened once per machine
+_active, _active_lock = {}, threading.Lock()
+
+def put_latest(q, item):
+    # Replace whatever is waiting in a size-1 queue; returns True when a stale item was dropped
+    dropped = False
+    try:
+        q.get_nowait()
+        dropped = True
+    except queue.Empty: pass
+    q.put_nowait(item)
+    return dropped
+
+def open_source(source):
+    # "0", "1", ... are webcam device indexes; anything else is a video file path
+    return cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+
+class LivePipeline:
+    def __init__(self, detector, source=0, max_width=DISPLAY_MAX_WIDTH, quality=70, loop_video=True, detect_every=1, change_threshold=None, target_fps=None, idle_timeout=IDLE_TIMEOUT):
+        self.detector, self.source = detector, source
+        # With a target FPS the detector's input size follows its measured inference time
+        if target_fps: detector.controller = ResolutionController(1000 / target_fps, size=detector.input_size, max_size=detector.input_size)
+        # With a change threshold, static scenes skip detector runs; with a tracker only the due
+        # detector runs are gated, so boxes are still tracked on every frame
+        self.gate = ChangeGate(change_threshold) if change_threshold is not None else None
+        # With detect_every > 1 the full detector runs every N frames and boxes are tracked in between
+        self.tracker = HazardTracker(detector, detect_every, gate=self.gate) if detect_every > 1 else None
+        self.model = self.tracker or (GatedDetector(detector, self.gate) if self.gate else detector)
+        self.max_width, self.quality, self.loop_video, self.idle_timeout = max_width, quality, loop_video, idle_timeout
+        self._frames, self._results = queue.Queue(maxsize=1), queue.Queue(maxsize=1)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._latest, self._polled = None, time.monotonic()
+        self._render_times, self._latencies = deque(maxlen=60), deque(maxlen=60)
+        self.captured = self.dropped = self.rendered = 0
+        self.error = None
+
+    @property
+    def running(self):
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self):
+        with _active_lock: previous, _active[str(self.source)] = _active.get(str(self.source)), self
+        if previous is not None and previous is not self: previous.stop()
+        self._stop.clear()
+        self._polled = time.monotonic()
+        self._threads = [threading.Thread(target=fn, name=f"live-{fn.__name__}", daemon=True) for fn in (self._capture, self._infer, self._render)]
+        for t in self._threads: t.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads:
+            if t is not threading.current_thread(): t.join(timeout=2)
+        with _active_lock:
+            if _active.get(str(self.source)) is self: del _active[str(self.source)]
+
+    def _drop(self):
+        # Called from both the capture and the inference thread
+        with self._lock: self.dropped += 1
+
+    def latest(self):
+        # (jpeg_bytes, result) of the newest rendered frame, or None before the first one.
+        # Each call also counts as a viewer being present for the idle watchdog.
+        with self._lock:
+            self._polled = time.monotonic()
+            return self._latest
+
+    def stats(self):
+        with self._lock:
+            times, lat, dropped = list(self._render_times), list(self._latencies), self.dropped
+        fps = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 0.0
+        stats = {
+            "fps": fps,
+            "latency_ms": sum(lat) / len(lat) * 1000 if lat else 0.0,
+            "captured": self.captured, "dropped": dropped, "rendered": self.rendered,
+        }
+        if self.tracker: stats["tracking"] = self.tracker.stats()
+        if self.gate: stats["skip_rate"] = self.gate.skip_rate
+        if self.detector.controller: stats["input_size"], stats["input_reason"] = self.detector.controller.size, self.detector.controller.reason
+        return stats
+
+    # --- Stages ---
+    def _capture(self):
+        cap = open_source(self.source)
+        if not cap.isOpened():
+            self.error = f"Could not open video source {self.source!r}"
+            self._stop.set()
+            return
+        # Video files are paced to their own frame rate so they behave like a camera
+        is_file = not str(self.source).isdigit()
+        frame_gap = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30.0) if is_file else 0.0
+        next_t = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                ok, frame = cap.read()
+                if not ok:
+                    if is_file and self.loop_video and cap.set(cv2.CAP_PROP_POS_FRAMES, 0): continue
+                    break
+                self.captured += 1
+                if put_latest(self._frames, (time.perf_counter(), frame)): self._drop()
+                if frame_gap:
+                    next_t += frame_gap
+                    time.sleep(max(0.0, next_t - time.perf_counter()))
+        finally:
+            cap.release()
+            self._stop.set()
+
+    def _infer(self):
+        while not self._stop.is_set():
+            try: t_capture, frame = self._frames.get(timeout=0.1)
+            except queue.Empty: continue
+            result = self.model.detect(frame)
+            if put_latest(self._results, (t_capture, frame, result)): self._drop()
+
+    def _render(self):
+        while not self._stop.is_set():
+            with self._lock: idle = time.monotonic() - self._polled
+            if self.idle_timeout and idle > self.idle_timeout:
+                # Nobody is watching (tab closed or navigated away): release the source
+                self.error = f"Stream stopped after {self.idle_timeout:.0f} s without a viewer"
+                self.stop()
+                break
+            try: t_capture, frame, result = self._results.get(timeout=0.1)
+            except queue.Empty: continue
+            jpeg = render_display_image(frame, result["detections"], self.max_width, quality=self.quality, roi=result["roi"])
+            now = time.perf_counter()
+            with self._lock:
+                self._latest = (jpeg, result)
+                self._render_times.append(now)
+                self._latencies.append(now - t_capture)
+            self.rendered += 1
@@ -0,0 +1,67 @@
+# ==============================================================================
+# "TripSafe AI: Load Test for the HTTP Detection Service"
+# Sends the same photo over keep-alive connections and reports latency
+# percentiles and throughput, e.g.:
+#   python tripsafe_loadtest.py room.jpg --concurrency 8 --requests 200
+# ==============================================================================
+
+import argparse
+import asyncio
+import sys
+import time
+
+async def read_response(reader):
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""): break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length": length = int(value)
+    await reader.readexactly(length)
+    return status
+
+async def client(host, port, path, body, counter, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    request = (f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/octet-stream\r\n"
+               f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body
+    try:
+        while counter[0] > 0:
+            counter[0] -= 1
+            t0 = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - t0)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] if values else 0.0
+
+async def run(args):
+    with open(args.image, "rb") as f: body = f.read()
+    latencies, statuses, counter = [], {}, [args.requests]
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(args.host, args.port, args.path, body, counter, latencies, statuses) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - t0
+    print(f"{len(latencies)} requests over {args.concurrency} connections in {elapsed:.2f}s")
+    print(f"  throughput: {len(latencies) / elapsed:.2f} req/s")
+    print(f"  latency p50: {percentile(latencies, 0.50) * 1000:.1f} ms   p99: {percentile(latencies, 0.99) * 1000:.1f} ms")
+    print(f"  status codes: {dict(sorted(statuses.items()))}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="tripsafe_loadtest", description="Load test for tripsafe_server")
+    parser.add_argument("image", help="photo to send with every request")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--path", default="/detect")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel keep-alive connections")
+    parser.add_argument("--requests", type=int, default=100, help="total requests")
+    asyncio.run(run(parser.parse_args(argv)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+# ==============================================================================
+# "TripSafe AI: Metrics"
+# In-process timing histograms and event counters for the scan pipeline, with
+# a Prometheus text export (GET /metrics on tripsafe_server, or a textfile for
+# node_exporter via TRIPSAFE_METRICS_FILE). Set TRIPSAFE_METRICS=0 to turn it
+# off; disabled timers are a shared no-op context, so hot paths pay ~nothing.
+# ==============================================================================
+
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+WINDOW = 500  # recent observations kept per stage for rolling percentiles
+_NULL = nullcontext()
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "total", "recent")
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.count, self.total = 0, 0.0
+        self.recent = deque(maxlen=WINDOW)
+
+    def add(self, ms):
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.total += ms
+        self.recent.append(ms)
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "t0")
+
+    def __init__(self, metrics, stage):
+        self.metrics, self.stage = metrics, stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, (time.perf_counter() - self.t0) * 1000)
+        return False
+
+class Metrics:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._hists, self._counters = {}, {}
+        self.started = time.time()
+
+    # --- Recording ---
+    def observe(self, stage, ms):
+        if not self.enabled: return
+        with self._lock:
+            hist = self._hists.get(stage)
+            if hist is None: hist = self._hists[stage] = _Histogram()
+            hist.add(ms)
+
+    def count(self, event, n=1):
+        if not self.enabled: return
+        with self._lock: self._counters[event] = self._counters.get(event, 0) + n
+
+    def timer(self, stage):
+        # with metrics.timer("decode"): ...
+        return _Timer(self, stage) if self.enabled else _NULL
+
+    def timed(self, stage):
+        # Decorator form of timer()
+        def wrap(fn):
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                if not self.enabled: return fn(*args, **kwargs)
+                with _Timer(self, stage): return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    def reset(self):
+        with self._lock: self._hists, self._counters = {}, {}
+
+    # --- Reading ---
+    def snapshot(self):
+        # {"stages": {stage: count/mean/p50/p95/max over the recent window}, "counters": {...}}
+        with self._lock:
+            hists = {stage: (h.count, h.total, sorted(h.recent)) for stage, h in self._hists.items()}
+            counters = dict(self._counters)
+        stages = {}
+        for stage, (count, total, recent) in sorted(hists.items()):
+            pct = lambda p: recent[min(len(recent) - 1, int(p * len(recent)))] if recent else 0.0
+            stages[stage] = {"count": count, "mean_ms": total / count if count else 0.0, "p50_ms": pct(0.50), "p95_ms": pct(0.95), "max_ms": recent[-1] if recent else 0.0}
+        return {"stages": stages, "counters": counters}
+
+    def render_prometheus(self):
+        with self._lock:
+            hists = {stage: (list(h.buckets), h.count, h.total, sorted(h.recent)) for stage, h in self._hists.items()}
+            counters = dict(self._counters)
+        lines = [
+            "# HELP tripsafe_stage_seconds Time spent in each scan pipeline stage.",
+            "# TYPE tripsafe_stage_seconds histogram",
+        ]
+        for stage, (buckets, count, total, _) in sorted(hists.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS_MS, buckets):
+                cumulative += n
+                lines.append(f'tripsafe_stage_seconds_bucket{{stage="{stage}",le="{bound / 1000:g}"}} {cumulative}')
+            lines.append(f'tripsafe_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'tripsafe_stage_seconds_sum{{stage="{stage}"}} {total / 1000:.6f}')
+            lines.append(f'tripsafe_stage_seconds_count{{stage="{stage}"}} {count}')
+        lines += [
+            f"# HELP tripsafe_stage_recent_seconds Rolling quantiles over the last {WINDOW} observations.",
+            "# TYPE tripsafe_stage_recent_seconds gauge",
+        ]
+        for stage, (_, _, _, recent) in sorted(hists.items()):
+            for q in (0.5, 0.95):
+                if recent: lines.append(f'tripsafe_stage_recent_seconds{{stage="{stage}",quantile="{q}"}} {recent[min(len(recent) - 1, int(q * len(recent)))] / 1000:.6f}')
+        lines += ["# HELP tripsafe_events_total Pipeline events such as cache hits and misses.", "# TYPE tripsafe_events_total counter"]
+        lines += [f'tripsafe_events_total{{event="{event}"}} {n}' for event, n in sorted(counters.items())]
+        lines += ["# TYPE tripsafe_uptime_seconds gauge", f"tripsafe_uptime_seconds {time.time() - self.started:.0f}"]
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        # Atomic replace, as the node_exporter textfile collector expects
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f: f.write(self.render_prometheus())
+        os.replace(tmp, path)
+
+    def start_textfile_writer(self, path, interval=15.0):
+        def loop():
+            while True:
+                try: self.write_textfile(path)
+                except OSError: pass
+                time.sleep(interval)
+        t = threading.Thread(target=loop, name="metrics-textfile", daemon=True)
+        t.start()
+        return t
+
+metrics = Metrics(enabled=os.environ.get("TRIPSAFE_METRICS", "1") != "0")
@@ -0,0 +1,129 @@
+# ==============================================================================
+# "TripSafe AI: Model Profiles"
+# A profile is one model bundle at one network input size on one cv2.dnn CPU
+# backend. Calibration times every profile available on this machine, and the
+# app then runs the most accurate profile that fits the per-frame budget.
+# ==============================================================================
+
+import json
+import logging
+import os
+import platform
+import time
+
+import cv2
+import numpy as np
+
+from tripsafe_engine import MANIFEST_NAME, MODEL_DIR, available_backends, load_yolo_model, run_yolo_forward
+
+MODELS = {
+    # name -> bundle directory (None = the built-in model) and accuracy rank; a higher rank wins
+    # at any input size. Extra models are only offered once their bundle has been installed.
+    "yolov3-tiny": {"dir": None, "rank": 0},
+    "yolov4-tiny": {"dir": os.path.join(MODEL_DIR, "models", "yolov4-tiny"), "rank": 1},
+    "yolov3": {"dir": os.path.join(MODEL_DIR, "models", "yolov3"), "rank": 2},
+}
+INPUT_SIZES = (320, 416, 608)
+LATENCY_BUDGET_MS = float(os.environ.get("TRIPSAFE_LATENCY_BUDGET_MS", 250))
+CALIBRATION_FILE = os.environ.get("TRIPSAFE_CALIBRATION") or os.path.join(MODEL_DIR, "models", "calibration.json")
+CALIBRATION_RUNS = 5
+
+log = logging.getLogger("tripsafe.profiles")
+
+def list_profiles():
+    profiles = []
+    for model, spec in MODELS.items():
+        if spec["dir"] and not os.path.exists(os.path.join(spec["dir"], MANIFEST_NAME)): continue
+        for backend in available_backends():
+            for size in INPUT_SIZES:
+                name = f"{model}-{size}" + ("" if backend == "opencv" else f"-{backend}")
+                profiles.append({"name": name, "model": model, "dir": spec["dir"], "input_size": size, "backend": backend})
+    return profiles
+
+def accuracy_key(profile):
+    return MODELS[profile["model"]]["rank"], profile["input_size"]
+
+def host_id():
+    return {"host": platform.node(), "cpus": os.cpu_count(), "opencv": cv2.__version__}
+
+def calibrate(profiles=None, runs=CALIBRATION_RUNS):
+    # Median forward time (blob + network) of each profile on a 720p frame. Each model is loaded
+    # once per backend; every size gets an untimed pass first so layer reallocation is not counted.
+    profiles = [dict(p) for p in (profiles or list_profiles())]
+    frame = np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    nets = {}
+    for p in profiles:
+        key = (p["dir"], p["backend"])
+        if key not in nets: nets[key] = load_yolo_model(p["dir"], warmup=False, backend=p["backend"])
+        net, output_layers, _, info = nets[key]
+        if net is None:
+            p["error"] = info["error"]
+            continue
+        run_yolo_forward(frame, net, output_layers, p["input_size"])
+        times = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            run_yolo_forward(frame, net, output_layers, p["input_size"])
+            times.append(time.perf_counter() - t0)
+        p["latency_ms"] = float(np.median(times)) * 1000
+    return [p for p in profiles if "latency_ms" in p]
+
+def calibrated_profiles(path=CALIBRATION_FILE, recalibrate=False):
+    # Reuses saved timings when they were taken on this host for the same set of profiles
+    profiles = list_profiles()
+    if not recalibrate and os.path.exists(path):
+        try:
+            with open(path) as f: saved = json.load(f)
+            if saved["host_id"] == host_id() and {p["name"] for p in saved["profiles"]} == {p["name"] for p in profiles}:
+                return saved["profiles"]
+        except (OSError, ValueError, KeyError): pass
+    measured = calibrate(profiles)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f: json.dump({"host_id": host_id(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "profiles": measured}, f, indent=2)
+    except OSError: pass
+    return measured
+
+def choose_profile(profiles, budget_ms=LATENCY_BUDGET_MS):
+    # Most accurate profile within the budget (the faster one on ties); the fastest if none fits
+    if not profiles: return None
+    fits = [p for p in profiles if p["latency_ms"] <= budget_ms]
+    if not fits: return min(profiles, key=lambda p: p["latency_ms"])
+    return max(fits, key=lambda p: (accuracy_key(p), -p["latency_ms"]))
+
+class ResolutionController:
+    # Feedback loop on the network input size: after each window of forward timings it steps
+    # the size down when the mean is over the target, or up one step when there is clear
+    # headroom. Timings are passed in by the caller, so a simulated sequence replays exactly.
+    def __init__(self, target_ms, size=416, min_size=224, max_size=608, window=8, headroom=0.7, step=32):
+        self.target_ms, self.window, self.headroom, self.step = target_ms, window, headroom, step
+        self.min_size, self.max_size = min_size, max_size
+        self.size = self._clamp(size)
+        self.reason = "initial size"
+        self.changes = []  # (frame, old_size, new_size, reason)
+        self._times, self.frames = [], 0
+
+    def _clamp(self, size):
+        return int(min(self.max_size, max(self.min_size, size // self.step * self.step)))
+
+    def observe(self, ms):
+        self.frames += 1
+        self._times.append(ms)
+        if len(self._times) < self.window: return self.size
+        mean = sum(self._times) / len(self._times)
+        self._times = []
+        if mean > self.target_ms:
+            # Inference cost grows with the pixel count, so jump straight to the size that should fit
+            new = min(self.size - self.step, self._clamp(self.size * (self.target_ms / mean) ** 0.5))
+            reason = f"mean {mean:.0f} ms over {self.target_ms:.0f} ms target"
+        elif mean < self.target_ms * self.headroom:
+            new = self.size + self.step
+            reason = f"mean {mean:.0f} ms under {self.headroom:.0%} of {self.target_ms:.0f} ms target"
+        else:
+            return self.size
+        new = self._clamp(new)
+        if new != self.size:
+            log.info("input size %d -> %d (%s)", self.size, new, reason)
+            self.changes.append((self.frames, self.size, new, reason))
+            self.size, self.reason = new, reason
+        return self.size
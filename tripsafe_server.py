@@ -0,0 +1,187 @@
+# ==============================================================================
+# "TripSafe AI: HTTP Detection Service"
+# A small asyncio HTTP/1.1 server so other tools (kiosk, mobile uploader) can
+# scan photos without driving the Streamlit UI, e.g.:
+#   python tripsafe_server.py --port 8600
+#   curl --data-binary @room.jpg localhost:8600/detect
+#   curl -F a=@room1.jpg -F b=@room2.jpg "localhost:8600/detect?lang=Hindi"
+# Endpoints: POST /detect, GET /health, GET /stats, GET /metrics (Prometheus text)
+# ==============================================================================
+
+import argparse
+import asyncio
+import email.parser
+import email.policy
+import json
+import sys
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from tripsafe_engine import HazardDetector
+from tripsafe_metrics import metrics
+from tripsafe_service import InferenceService, configure_threads
+
+MAX_BODY = 20 * 1024 * 1024
+MAX_HEADER_LINES = 100
+MAX_INFLIGHT = 32
+KEEPALIVE_TIMEOUT = 15.0
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 408: "Request Timeout",
+           413: "Payload Too Large", 422: "Unprocessable Entity", 503: "Service Unavailable"}
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def parse_multipart(content_type, body):
+    # (filename, bytes) for every file part of a multipart/form-data body
+    msg = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body)
+    if not msg.is_multipart(): raise HttpError(400, "malformed multipart body")
+    return [(part.get_filename() or part.get_param("name", header="content-disposition") or f"image_{i}", part.get_payload(decode=True) or b"")
+            for i, part in enumerate(msg.iter_parts())]
+
+class DetectionServer:
+    def __init__(self, detector, max_inflight=MAX_INFLIGHT, max_body=MAX_BODY):
+        self.detector, self.max_body = detector, max_body
+        # Backpressure: at most max_inflight images are being scanned; beyond that callers get a 503
+        self.max_inflight, self.inflight = max_inflight, 0
+        self.requests = self.rejected = self.connections = 0
+        self.started = time.time()
+
+    # --- Connection handling ---
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self.read_request(reader), KEEPALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HttpError as e:
+                    await self.respond(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None: break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    status, payload = await self.route(method, target, headers, body)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive: break
+        finally:
+            self.connections -= 1
+            writer.close()
+            try: await writer.wait_closed()
+            except ConnectionError: pass
+
+    async def read_request(self, reader):
+        line = await reader.readline()
+        if not line: return None
+        try: method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError: raise HttpError(400, "malformed request line")
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""): break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HttpError(400, "too many headers")
+        if "chunked" in headers.get("transfer-encoding", "").lower(): raise HttpError(400, "chunked bodies are not supported; send Content-Length")
+        length = headers.get("content-length") or "0"
+        # Digits only: int() would also take "+5", " 5" or "1_000"; anything odd is refused before reading
+        if not length.isascii() or not length.isdigit(): raise HttpError(400, "Content-Length must be a non-negative integer")
+        length = int(length)
+        if length > self.max_body: raise HttpError(413, f"body larger than {self.max_body} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+
+    async def respond(self, writer, status, payload, keep_alive=True):
+        # str payloads go out as Prometheus text, everything else as JSON
+        if isinstance(payload, str): body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else: body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}",
+                f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if status == 503: head.append("Retry-After: 1")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    # --- Routes ---
+    async def route(self, method, target, headers, body):
+        url = urlsplit(target)
+        if url.path == "/health":
+            return 200, {"status": "ok", "model_ready": self.detector.ready}
+        if url.path == "/stats":
+            return 200, self.stats()
+        if url.path == "/metrics":
+            return 200, metrics.render_prometheus()
+        if url.path != "/detect": raise HttpError(404, f"unknown path {url.path}")
+        if method != "POST": raise HttpError(405, "use POST with image bytes or multipart/form-data")
+
+        lang = parse_qs(url.query).get("lang", ["English"])[0]
+        content_type = headers.get("content-type", "")
+        if content_type.startswith("multipart/"):
+            items = parse_multipart(content_type, body)
+        else:
+            items = [("image", body)]
+        if not items or not all(data for _, data in items): raise HttpError(400, "empty image")
+        if self.inflight + len(items) > self.max_inflight:
+            self.rejected += 1
+            raise HttpError(503, "server busy, retry shortly")
+
+        self.requests += 1
+        self.inflight += len(items)
+        try:
+            results = await asyncio.gather(*(self.scan(name, data, lang) for name, data in items))
+        finally:
+            self.inflight -= len(items)
+        if content_type.startswith("multipart/"): return 200, {"results": results}
+        if "error" in results[0]: raise HttpError(422, results[0]["error"])
+        return 200, results[0]
+
+    async def scan(self, name, data, lang):
+        # The scan itself blocks, so it runs on the default thread pool; forward passes from
+        # concurrent requests meet in the InferenceService and share batched calls
+        result = await asyncio.get_running_loop().run_in_executor(None, self.detector.scan_bytes, data, lang)
+        if result is None: return {"name": name, "error": "could not decode image"}
+        result["name"] = name
+        return result
+
+    def stats(self):
+        stats = {"uptime_s": time.time() - self.started, "requests": self.requests, "rejected": self.rejected,
+                 "inflight": self.inflight, "connections": self.connections}
+        if self.detector.service: stats["inference"] = self.detector.service.stats()
+        return stats
+
+async def serve(host, port, detector, max_inflight=MAX_INFLIGHT):
+    app = DetectionServer(detector, max_inflight)
+    server = await asyncio.start_server(app.handle, host, port, backlog=256)
+    print(f"TripSafe detection service on http://{host}:{port}", file=sys.stderr)
+    async with server: await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="tripsafe_server", description="TripSafe AI HTTP detection service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=None, help="inference workers (Net instances)")
+    parser.add_argument("--max-inflight", type=int, default=MAX_INFLIGHT, help="images in progress before returning 503")
+    parser.add_argument("--conf", type=float, default=0.25, help="confidence threshold")
+    parser.add_argument("--nms", type=float, default=0.4, help="NMS threshold")
+    parser.add_argument("--floor", choices=["off", "band", "edges"], default="off", help="floor-region gating")
+    args = parser.parse_args(argv)
+
+    configure_threads(args.workers)
+    detector = HazardDetector(args.conf, args.nms, floor_mode=args.floor, service=InferenceService(args.workers))
+    if not detector.ready:
+        print(f"Model files could not be loaded: {detector.model_info.get('error', '')}", file=sys.stderr)
+        return 1
+    if not detector.model_info.get("verified"): print("Warning: serving unverified model files (TRIPSAFE_ALLOW_UNVERIFIED is set).", file=sys.stderr)
+    try:
+        asyncio.run(serve(args.host, args.port, detector, args.max_inflight))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# ==============================================================================
+# "TripSafe AI: Shared Inference Service"
+# One in-process pool of cv2.dnn Net instances behind a request queue. A cv2.dnn
+# Net is not safe to call from several threads at once, so every browser session
+# submits here instead. Requests that arrive within a short window are stacked
+# into one batched forward pass.
+# ==============================================================================
+
+import cv2
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from tripsafe_engine import DEFAULT_PROFILE, load_yolo_model, map_rows_to_image, run_batch_forward, run_scan_forward
+
+FORWARD_TIMEOUT = 120.0  # seconds a blocking forward() waits before giving up
+
+def default_workers():
+    return max(1, (os.cpu_count() or 1) // 2)
+
+def threads_per_worker(workers):
+    return max(1, (os.cpu_count() or 1) // workers)
+
+def configure_threads(workers=None):
+    # cv2.setNumThreads is process-wide, so the app or server calls this once at startup
+    # instead of every InferenceService overriding it; the cores are split between the workers
+    threads = threads_per_worker(workers or default_workers())
+    cv2.setNumThreads(threads)
+    return threads
+
+class _Request:
+    __slots__ = ("img", "tiling", "roi", "future", "t_submit")
+
+    def __init__(self, img, tiling, roi):
+        self.img, self.tiling, self.roi = img, tiling, roi
+        self.future, self.t_submit = Future(), time.perf_counter()
+
+class InferenceService:
+    def __init__(self, workers=None, max_batch=8, batch_window=0.01, model_dir=None, profile=None):
+        self.workers = workers or default_workers()
+        self.max_batch, self.batch_window = max_batch, batch_window
+        self.profile = profile or DEFAULT_PROFILE
+        self.input_size = self.profile["input_size"]
+        self.threads_per_worker = threads_per_worker(self.workers)  # applied by configure_threads()
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()  # orders submit() against shutdown() so no request is stranded
+        self._latencies, self._batch_sizes = deque(maxlen=500), deque(maxlen=500)
+        self.completed = self.failed = 0
+        self._stop = threading.Event()
+        self._threads = []
+        self.classes, self.model_info = [], {}
+        for i in range(self.workers):
+            net, output_layers, classes, info = load_yolo_model(model_dir or self.profile["dir"], backend=self.profile["backend"], input_size=self.input_size)
+            if i == 0: self.classes, self.model_info = classes or [], info
+            if net is None: break
+            t = threading.Thread(target=self._worker, args=(net, output_layers), name=f"inference-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    @property
+    def ready(self):
+        return bool(self._threads) and not self._stop.is_set()
+
+    # --- Client API ---
+    def submit(self, img, tiling=None, roi=None):
+        # Future resolving to the raw (N, 85) rows in full-image coordinates. Without a loaded
+        # model, or after shutdown, it comes back already failed instead of never resolving.
+        req = _Request(img, tiling, roi)
+        with self._submit_lock:
+            if self.ready:
+                self._queue.put(req)
+                return req.future
+        req.future.set_exception(RuntimeError(self.model_info.get("error") or "inference service is not running"))
+        return req.future
+
+    def _result(self, future, timeout):
+        try: return future.result(timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise RuntimeError(f"inference did not finish within {timeout:.0f} s") from None
+
+    def forward(self, img, tiling=None, roi=None, timeout=FORWARD_TIMEOUT):
+        return self._result(self.submit(img, tiling, roi), timeout)
+
+    def forward_batch(self, imgs, timeout=FORWARD_TIMEOUT):
+        futures = [self.submit(img) for img in imgs]
+        deadline = time.monotonic() + timeout
+        return [self._result(f, max(0.0, deadline - time.monotonic())) for f in futures]
+
+    def stats(self):
+        with self._lock:
+            lat = sorted(self._latencies)
+            sizes = list(self._batch_sizes)
+        pct = lambda p: lat[min(len(lat) - 1, int(p * len(lat)))] * 1000 if lat else 0.0
+        return {
+            "workers": len(self._threads), "threads_per_worker": self.threads_per_worker,
+            "queue_depth": self._queue.qsize(), "completed": self.completed, "failed": self.failed,
+            "p50_ms": pct(0.50), "p95_ms": pct(0.95),
+            "mean_batch": sum(sizes) / len(sizes) if sizes else 0.0,
+        }
+
+    def shutdown(self):
+        # Once stop is set under the submit lock, no later submit() can reach the queue
+        with self._submit_lock: self._stop.set()
+        for t in self._threads: t.join(timeout=2)
+        # Anything still queued will never run; fail it so no caller waits forever
+        while True:
+            try: req = self._queue.get_nowait()
+            except queue.Empty: break
+            if req.future.set_running_or_notify_cancel(): req.future.set_exception(RuntimeError("inference service shut down"))
+
+    # --- Worker side ---
+    def _collect(self, first):
+        # Gather whatever else arrives within the batching window, up to max_batch
+        batch, deadline = [first], time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0: break
+            try: batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty: break
+        return batch
+
+    def _worker(self, net, output_layers):
+        while not self._stop.is_set():
+            try: first = self._queue.get(timeout=0.2)
+            except queue.Empty: continue
+            # Futures cancelled while queued (superseded scans) are dropped before the network
+            batch = [r for r in self._collect(first) if r.future.set_running_or_notify_cancel()]
+            # Tiled requests already batch their own tiles, so they run on their own
+            plain = [r for r in batch if not r.tiling]
+            for r in batch:
+                if r.tiling: self._run(lambda r=r: [run_scan_forward(r.img, net, output_layers, r.tiling, r.roi, self.input_size)], [r])
+            if plain: self._run(lambda: self._forward_plain(plain, net, output_layers), plain)
+
+    def _forward_plain(self, reqs, net, output_layers):
+        crops = [r.img if r.roi is None else r.img[r.roi[1]:r.roi[1] + r.roi[3], r.roi[0]:r.roi[0] + r.roi[2]] for r in reqs]
+        rows = run_batch_forward(crops, net, output_layers, self.input_size)
+        return [rw if r.roi is None else map_rows_to_image(rw[None], [r.roi], r.img.shape[1], r.img.shape[0]) for r, rw in zip(reqs, rows)]
+
+    def _run(self, fn, reqs):
+        try:
+            results = fn()
+        except Exception as e:
+            with self._lock: self.failed += len(reqs)
+            for r in reqs: r.future.set_exception(e)
+            return
+        now = time.perf_counter()
+        with self._lock:
+            self._batch_sizes.append(len(reqs))
+            self._latencies.extend(now - r.t_submit for r in reqs)
+            self.completed += len(reqs)
+        for r, rows in zip(reqs, results): r.future.set_result(rows)
@@ -0,0 +1,182 @@
+# ==============================================================================
+# "TripSafe AI: Detect-then-Track & Change Gating"
+# Runs the full detector only every N frames (or when tracking gets unsure) and
+# carries boxes forward in between with sparse optical flow. Each hazard keeps a
+# stable ID across frames so counts and alerts do not flicker. A change gate
+# skips the detector runs that are due while the scene is static; tracking itself
+# keeps running on every frame.
+# ==============================================================================
+
+import cv2
+import numpy as np
+import time
+
+from tripsafe_engine import HIGH_RISK_ITEMS, SAFE_ZONES, risk_level
+
+FLOW_WIDTH = 320
+CHANGE_THRESHOLD = 4.0
+GATE_GRID = 8  # the gate thumbnail is compared in GATE_GRID x GATE_GRID cells
+LK_PARAMS = dict(winSize=(15, 15), maxLevel=2, criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0.0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0.0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+def track_box(prev_gray, gray, box):
+    # Median optical-flow shift of corner points inside the box, with a forward-backward
+    # check. Returns (dx, dy, confidence) where confidence is the share of points kept.
+    x, y, w, h = (int(round(v)) for v in box)
+    mask = np.zeros_like(prev_gray)
+    mask[max(0, y):max(0, y + h), max(0, x):max(0, x + w)] = 255
+    pts = cv2.goodFeaturesToTrack(prev_gray, maxCorners=20, qualityLevel=0.01, minDistance=3, mask=mask)
+    if pts is None or len(pts) < 3: return 0.0, 0.0, 0.0
+    nxt, st, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, pts, None, **LK_PARAMS)
+    back, st_back, _ = cv2.calcOpticalFlowPyrLK(gray, prev_gray, nxt, None, **LK_PARAMS)
+    fb_err = np.linalg.norm((pts - back).reshape(-1, 2), axis=1)
+    good = (st.ravel() == 1) & (st_back.ravel() == 1) & (fb_err < 1.0)
+    if good.sum() < 3: return 0.0, 0.0, 0.0
+    shift = np.median((nxt - pts).reshape(-1, 2)[good], axis=0)
+    return float(shift[0]), float(shift[1]), float(good.sum() / len(pts))
+
+class ChangeGate:
+    # Largest per-cell mean absolute difference of 32x32 grayscale thumbnails (0-255 scale)
+    # against the last frame that was actually analysed. Per cell rather than over the whole
+    # frame, so a small object moving into view is not averaged away; comparing with the last
+    # analysed frame means slow drift still triggers a new scan eventually.
+    def __init__(self, threshold=CHANGE_THRESHOLD, size=32, grid=GATE_GRID):
+        self.threshold, self.size, self.grid = threshold, size, grid
+        self._ref = self._pending = None
+        self.frames = self.skipped = 0
+
+    def signature(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.resize(gray, (self.size, self.size), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def difference(self, frame):
+        self._pending = self.signature(frame)
+        if self._ref is None: return float("inf")
+        cell = self.size // self.grid
+        diff = np.abs(self._pending - self._ref)[:cell * self.grid, :cell * self.grid]
+        return float(diff.reshape(self.grid, cell, self.grid, cell).mean(axis=(1, 3)).max())
+
+    def record(self, skipped):
+        self.frames += 1
+        if skipped: self.skipped += 1
+        else: self._ref = self._pending
+
+    def changed(self, frame):
+        changed = self.difference(frame) >= self.threshold
+        self.record(not changed)
+        return changed
+
+    @property
+    def skip_rate(self):
+        return self.skipped / self.frames if self.frames else 0.0
+
+class GatedDetector:
+    # Wraps a detector without tracking; near-identical frames get the previous result back.
+    # With a tracker, pass the gate to HazardTracker instead so boxes keep moving.
+    def __init__(self, model, gate):
+        self.model, self.gate = model, gate
+        self._last = None
+
+    def detect(self, frame):
+        if self.gate.changed(frame) or self._last is None:
+            self._last = self.model.detect(frame)
+        return self._last
+
+class HazardTracker:
+    def __init__(self, detector, detect_every=5, min_confidence=0.5, iou_match=0.3, gate=None):
+        self.detector, self.detect_every, self.gate = detector, max(1, int(detect_every)), gate
+        self.min_confidence, self.iou_match = min_confidence, iou_match
+        self.tracks = []  # {"id", "label", "confidence", "box": [x, y, w, h] as floats}
+        self._next_id = 1
+        self._prev_gray, self._since_detect, self._roi = None, None, None
+        self.frames = self.detector_runs = 0
+        # Seconds and frames per mode, timed around update() on the calling thread. Not process
+        # CPU time, which also counts other sessions and the pipeline's other threads; not thread
+        # CPU time either, which misses the OpenCV worker threads inside the forward pass.
+        self._time = {"detect": [0.0, 0], "track": [0.0, 0]}
+
+    def update(self, frame):
+        t0 = time.perf_counter()
+        h_img, w_img = frame.shape[:2]
+        scale = min(1.0, FLOW_WIDTH / w_img)
+        gray = cv2.cvtColor(cv2.resize(frame, (round(w_img * scale), round(h_img * scale)), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+
+        confidence = self._carry_forward(gray, scale) if self._prev_gray is not None else 0.0
+        due = self._since_detect is None or self._since_detect + 1 >= self.detect_every
+        if (due or confidence < self.min_confidence) and self.gate is not None and not self.gate.changed(frame):
+            # Scene unchanged since the last detector run: the tracked boxes stand in for it
+            self._since_detect, mode = 0, "gated"
+        elif due or confidence < self.min_confidence:
+            result = self.detector.detect(frame)
+            self._assign_ids(result["detections"])
+            self._roi, self._since_detect, mode = result["roi"], 0, "detect"
+            self.detector_runs += 1
+        else:
+            self._since_detect += 1
+            mode = "track"
+        self._prev_gray = gray
+        self.frames += 1
+
+        spent = self._time["detect" if mode == "detect" else "track"]
+        spent[0] += time.perf_counter() - t0
+        spent[1] += 1
+        result = self._result()
+        result["mode"], result["tracking_confidence"] = mode, confidence
+        return result
+
+    def detect(self, frame):
+        # Same call shape as HazardDetector.detect, so the tracker can stand in for it
+        return self.update(frame)
+
+    def stats(self):
+        (det_s, det_n), (trk_s, _) = self._time["detect"], self._time["track"]
+        per_detect = det_s / det_n if det_n else 0.0
+        per_frame = (det_s + trk_s) / self.frames if self.frames else 0.0
+        return {
+            "frames": self.frames, "detector_runs": self.detector_runs,
+            "ms_per_frame": per_frame * 1000, "ms_per_detect": per_detect * 1000,
+            "saving": 1 - per_frame / per_detect if per_detect else 0.0,
+        }
+
+    def _carry_forward(self, gray, scale):
+        # Moves every track by its optical-flow shift; overall confidence is the weakest track's.
+        # An empty scene counts as fully confident, so it is still only re-checked every N frames.
+        confidence = 1.0
+        for t in self.tracks:
+            dx, dy, c = track_box(self._prev_gray, gray, [v * scale for v in t["box"]])
+            t["box"][0] += dx / scale
+            t["box"][1] += dy / scale
+            confidence = min(confidence, c)
+        return confidence
+
+    def _assign_ids(self, detections):
+        # Greedy IoU matching against existing tracks of the same label; unmatched detections get new IDs
+        pairs = sorted(((iou(t["box"], d["box"]), ti, di) for ti, t in enumerate(self.tracks) for di, d in enumerate(detections) if t["label"] == d["label"]), reverse=True)
+        used_t, ids = set(), {}
+        for score, ti, di in pairs:
+            if score < self.iou_match: break
+            if ti in used_t or di in ids: continue
+            used_t.add(ti)
+            ids[di] = self.tracks[ti]["id"]
+        tracks = []
+        for di, d in enumerate(detections):
+            if di not in ids:
+                ids[di] = self._next_id
+                self._next_id += 1
+            tracks.append({"id": ids[di], "label": d["label"], "confidence": d["confidence"], "box": [float(v) for v in d["box"]]})
+        self.tracks = tracks
+
+    def _result(self):
+        detections = [{"id": t["id"], "label": t["label"], "confidence": t["confidence"], "box": [int(round(v)) for v in t["box"]]} for t in self.tracks]
+        hazards = [d["label"] for d in detections if d["label"] in HIGH_RISK_ITEMS]
+        zones = [d["label"] for d in detections if d["label"] in SAFE_ZONES]
+        risk, risk_count = risk_level(hazards)
+        return {"detections": detections, "hazards": hazards, "zones": zones, "risk": risk, "risk_count": risk_count, "roi": self._roi}
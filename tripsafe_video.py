@@ -0,0 +1,137 @@
+# ==============================================================================
+# "TripSafe AI: Video Walkthrough Analysis"
+# Offline analysis of a recorded video file. The video is cut into frame-range
+# segments that run on a process pool (one HazardDetector per worker); each
+# worker samples frames at a fixed rate and returns hazard events, which are
+# merged into one timeline of HIGH_RISK_ITEMS with a keyframe thumbnail each.
+# ==============================================================================
+
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from tripsafe_engine import HIGH_RISK_ITEMS, detector_settings, init_pool_worker, pool_detector, render_display_image
+
+SAMPLE_FPS = 2.0
+THUMB_WIDTH = 320
+VIDEO_EXTS = ('.mp4', '.mov', '.avi', '.mkv', '.m4v', '.webm')
+
+def probe_video(path):
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened(): return None
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return {"fps": fps, "frames": frames, "duration_s": frames / fps, "size": (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))}
+    finally:
+        cap.release()
+
+def plan_segments(frames, step, segments):
+    # Contiguous [start, end) frame ranges with starts on the sampling grid, so the frames
+    # sampled are the same whatever the segment count
+    samples = (frames + step - 1) // step
+    segments = max(1, min(segments, samples))
+    bounds = [round(i * samples / segments) * step for i in range(segments + 1)]
+    return [(bounds[i], min(bounds[i + 1], frames)) for i in range(segments) if bounds[i] < frames]
+
+def add_sighting(events, label, t, count, conf, max_gap):
+    # Extends the label's last event when it ended within max_gap seconds, else opens a new one.
+    # Returns the event and whether this sighting is its new peak (for the keyframe).
+    last = next((ev for ev in reversed(events) if ev["label"] == label), None)
+    if last is None or t - last["end_s"] > max_gap:
+        last = {"label": label, "start_s": t, "end_s": t, "frames": 0, "max_count": 0, "peak_conf": 0.0, "keyframe_s": t, "keyframe": None}
+        events.append(last)
+    last["end_s"], last["frames"] = t, last["frames"] + 1
+    last["max_count"] = max(last["max_count"], count)
+    if conf <= last["peak_conf"]: return last, False
+    last["peak_conf"], last["keyframe_s"] = conf, t
+    return last, True
+
+def merge_events(events, max_gap):
+    # Joins events of one label that touch across segment boundaries; keeps the stronger keyframe
+    merged = []
+    for ev in sorted(events, key=lambda e: (e["label"], e["start_s"])):
+        prev = merged[-1] if merged and merged[-1]["label"] == ev["label"] else None
+        if prev is None or ev["start_s"] - prev["end_s"] > max_gap:
+            merged.append(dict(ev))
+            continue
+        prev["end_s"], prev["frames"] = max(prev["end_s"], ev["end_s"]), prev["frames"] + ev["frames"]
+        prev["max_count"] = max(prev["max_count"], ev["max_count"])
+        if ev["peak_conf"] > prev["peak_conf"]: prev.update(peak_conf=ev["peak_conf"], keyframe_s=ev["keyframe_s"], keyframe=ev["keyframe"])
+    return sorted(merged, key=lambda e: (e["start_s"], e["label"]))
+
+def _analyse_segment(path, start, end, step, fps, max_gap, thumb_width=THUMB_WIDTH):
+    # Skipped frames are only grabbed (demuxed), not decoded; sampled ones go through the detector
+    cap = cv2.VideoCapture(path)
+    if start: cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    events, sampled, detect_s = [], 0, 0.0
+    try:
+        for idx in range(start, end):
+            if idx % step:
+                if not cap.grab(): break
+                continue
+            ok, frame = cap.read()
+            if not ok: break
+            t0 = time.perf_counter()
+            result = pool_detector().detect(frame)
+            detect_s += time.perf_counter() - t0
+            sampled += 1
+            t = idx / fps
+            best = {}
+            for det in result["detections"]:
+                if det["label"] not in HIGH_RISK_ITEMS: continue
+                count, conf = best.get(det["label"], (0, 0.0))
+                best[det["label"]] = (count + 1, max(conf, det["confidence"]))
+            for label, (count, conf) in best.items():
+                ev, is_peak = add_sighting(events, label, t, count, conf, max_gap)
+                if is_peak: ev["keyframe"] = render_display_image(frame, result["detections"], max_width=thumb_width, quality=75, roi=result["roi"])
+    finally:
+        cap.release()
+    return {"start": start, "end": end, "sampled": sampled, "detect_s": detect_s, "events": events}
+
+def analyse_video(path, settings=None, sample_fps=SAMPLE_FPS, workers=None, segments=None, max_gap=None, progress=None):
+    # Returns the merged hazard timeline plus speed figures; progress(done, total) is called as
+    # segments finish. Workers are spawned, not forked, so this is safe to call from a
+    # threaded server process.
+    info = probe_video(path)
+    if info is None: raise ValueError(f"could not open video {path!r}")
+    if info["frames"] <= 0: raise ValueError(f"video {path!r} has no frames")
+    workers = workers or multiprocessing.cpu_count()
+    step = max(1, round(info["fps"] / sample_fps))
+    max_gap = max_gap if max_gap is not None else 2 * step / info["fps"]  # one missed sample still joins
+    plan = plan_segments(info["frames"], step, segments or workers * 2)
+
+    t0 = time.perf_counter()
+    parts = []
+    with ProcessPoolExecutor(min(workers, len(plan)), mp_context=multiprocessing.get_context("spawn"), initializer=init_pool_worker, initargs=(settings or detector_settings(),)) as pool:
+        futures = [pool.submit(_analyse_segment, path, start, end, step, info["fps"], max_gap) for start, end in plan]
+        for f in as_completed(futures):
+            parts.append(f.result())
+            if progress: progress(len(parts), len(plan))
+    elapsed = time.perf_counter() - t0
+
+    sampled = sum(p["sampled"] for p in parts)
+    return dict(info, **{
+        "video": path, "sample_fps": info["fps"] / step, "segments": len(plan), "workers": min(workers, len(plan)),
+        "sampled": sampled, "elapsed_s": elapsed, "speed_x": info["duration_s"] / elapsed if elapsed else 0.0,
+        "detect_ms": sum(p["detect_s"] for p in parts) / sampled * 1000 if sampled else 0.0,
+        "events": merge_events([ev for p in parts for ev in p["events"]], max_gap),
+    })
+
+def analyse_upload(data, suffix, settings=None, **kwargs):
+    # analyse_video for uploaded bytes: OpenCV reads video from a path, so the bytes are spooled
+    # to a private temp file that is removed however the analysis ends
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix="tripsafe_")
+    try:
+        with os.fdopen(fd, "wb") as f: f.write(data)
+        return analyse_video(path, settings, **kwargs)
+    finally:
+        os.remove(path)
+
+def format_ts(seconds):
+    m, s = divmod(seconds, 60)
+    return f"{int(m):02d}:{s:04.1f}"